@@ -0,0 +1,151 @@
+"""Checks the bitboard Connect Four engine against a plain grid scan, then times both.
+
+The checks cover every line of four on the board, full and off-board columns,
+drawn boards and thousands of random games. The timings compare the win check
+`connect4` used to run after every move, scanning a list of columns, with
+`tools.connect4`.
+
+Run from the repository root:
+    python benchmarks/connect4.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import connect4  # noqa: E402
+from tools.connect4 import HEIGHT, WIDTH  # noqa: E402
+
+GAMES = 1000
+NUMBER = 10
+
+# Start cell and step of every line of four, 69 on a 7 by 6 board.
+LINES = [
+    (column, row, d_column, d_row)
+    for d_column, d_row in ((0, 1), (1, 0), (1, 1), (1, -1))
+    for column in range(WIDTH)
+    for row in range(HEIGHT)
+    if 0 <= column + 3 * d_column < WIDTH and 0 <= row + 3 * d_row < HEIGHT
+]
+
+
+def grid_has_four(grid: list, player: int) -> bool:
+    """Reference win check, `grid` is a list of columns listing their checkers bottom up."""
+    for column, row, d_column, d_row in LINES:
+        cells = [(column + i * d_column, row + i * d_row) for i in range(4)]
+        if all(r < len(grid[c]) and grid[c][r] == player for c, r in cells):
+            return True
+    return False
+
+
+def random_game(rng: random.Random) -> list:
+    """Moves of a game played to a win or a full board."""
+    board = connect4.Board()
+    moves = []
+    while not board.is_full():
+        column = rng.choice(board.columns())
+        moves.append(column)
+        if board.play(column):
+            break
+    return moves
+
+
+def check_lines() -> None:
+    """Every line of four is found on its own, and three of it never are."""
+    assert len(LINES) == 69
+    for column, row, d_column, d_row in LINES:
+        stones = 0
+        for i in range(4):
+            stones |= 1 << ((column + i * d_column) * (HEIGHT + 1) + row + i * d_row)
+            assert connect4.has_four(stones) == (i == 3), (column, row, d_column, d_row)
+
+
+def check_edges() -> None:
+    """Full columns, columns off the board and a drawn board."""
+    board = connect4.Board()
+    for _ in range(HEIGHT):
+        assert not board.play(0)
+    assert board.height(0) == HEIGHT and 0 not in board.columns()
+    for column in (0, -1, WIDTH):
+        assert not board.can_play(column)
+        try:
+            board.play(column)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"played column {column}")
+
+    # The first random game that fills the board without a winner.
+    rng = random.Random(0)
+    while True:
+        moves = random_game(rng)
+        board = connect4.Board()
+        if len(moves) == WIDTH * HEIGHT and not any(map(board.play, moves)):
+            break
+    board = connect4.Board()
+    for column in moves[:-1]:
+        assert not board.is_full() and not board.play(column)
+    assert board.columns() == [moves[-1]] and not board.is_winning_move(moves[-1])
+    board.play(moves[-1])
+    assert board.is_full() and board.winner() is None and board.legal_moves() == 0
+    assert board.columns() == []
+
+
+def check_games() -> None:
+    """Random games agree with the reference after every move."""
+    rng = random.Random(4)
+    for _ in range(GAMES):
+        board = connect4.Board()
+        grid = [[] for _ in range(WIDTH)]
+        for column in random_game(rng):
+            player = board.turn
+            assert board.can_play(column) == (len(grid[column]) < HEIGHT)
+            winning = board.is_winning_move(column)
+            won = board.play(column)
+            grid[column].append(player)
+            assert won == winning == grid_has_four(grid, player)
+            assert board.winner() == (player if won else None)
+            assert all(
+                board.cell(c, r) == (grid[c][r] if r < len(grid[c]) else None)
+                for c in range(WIDTH)
+                for r in range(HEIGHT)
+            )
+            assert board.columns() == [c for c in range(WIDTH) if len(grid[c]) < HEIGHT]
+        assert board.is_full() == all(len(column) == HEIGHT for column in grid)
+
+
+def main() -> None:
+    check_lines()
+    check_edges()
+    check_games()
+    print("checks passed")
+
+    rng = random.Random(7)
+    games = [random_game(rng) for _ in range(100)]
+    moves = sum(len(game) for game in games)
+
+    def grid() -> None:
+        for game in games:
+            columns = [[] for _ in range(WIDTH)]
+            for i, column in enumerate(game):
+                columns[column].append(i & 1)
+                grid_has_four(columns, i & 1)
+
+    def bitboard() -> None:
+        for game in games:
+            board = connect4.Board()
+            for column in game:
+                board.play(column)
+
+    baseline = None
+    for name, func in (("Grid scan", grid), ("Bitboard", bitboard)):
+        seconds = min(timeit.repeat(func, number=NUMBER, repeat=3))
+        per_move = seconds / (NUMBER * moves) * 1e6
+        baseline = baseline or per_move
+        print(f"{name:<10} {per_move:8.2f} µs/move  {baseline / per_move:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
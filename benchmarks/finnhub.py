@@ -0,0 +1,136 @@
+"""Checks the Finnhub client against a local stub server, then times a batch of quotes.
+
+The stub answers `/api/v1/quote` by symbol, so every path of `Finnhub.get` can be
+hit on purpose: a 5xx that clears on retry, a 429 with Retry-After, a request that
+times out every try, a 200 whose body isn't JSON, an API error in the body and a
+status that isn't retried. Then `quotes()` fetches a batch of tickers under the
+shipped rate limit, each answered after a delay like the real API's.
+
+Run from the repository root:
+    python benchmarks/finnhub.py [tickers]
+"""
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web  # noqa: E402
+
+from tools.finnhub import BURST, RATE_LIMIT, Finnhub, FinnhubError  # noqa: E402
+
+TICKERS = 50
+# Seconds the stub takes to answer a quote in the timed run.
+LATENCY = 0.2
+# Client settings for the checks, short so failures come quickly.
+TIMEOUT = 0.2
+RETRIES = 2
+BACKOFF = 0.05
+
+
+class Stub:
+    """Canned Finnhub answers, chosen by the symbol asked for."""
+
+    def __init__(self):
+        self.hits = Counter()
+        self.latency = 0.0
+
+    async def quote(self, request: web.Request) -> web.Response:
+        symbol = request.query["symbol"]
+        self.hits[symbol] += 1
+        first = self.hits[symbol] == 1
+        if symbol == "FLAKY" and first:
+            return web.Response(status=503, text="upstream unavailable")
+        if symbol == "LIMITED" and first:
+            return web.Response(status=429, headers={"Retry-After": "1"})
+        if symbol == "SLOW":
+            await asyncio.sleep(TIMEOUT * 5)
+        if symbol == "HTML":
+            return web.Response(text="<html>gateway</html>", content_type="text/html")
+        if symbol == "ERROR":
+            return web.json_response({"error": "Invalid symbol"})
+        if symbol == "DENIED":
+            return web.Response(status=403, text="You don't have access")
+        await asyncio.sleep(self.latency)
+        return web.json_response({"c": 100.0, "pc": 99.0, "t": int(time.time())})
+
+
+async def expect_error(finnhub: Finnhub, symbol: str) -> str:
+    try:
+        await finnhub.quote(symbol)
+    except FinnhubError as e:
+        return str(e)
+    raise AssertionError(f"{symbol} didn't raise FinnhubError")
+
+
+async def check(finnhub: Finnhub, stub: Stub) -> None:
+    """Every retry and failure path of `Finnhub.get`."""
+    assert (await finnhub.quote("AAPL"))["c"] == 100.0
+    assert stub.hits["AAPL"] == 1
+
+    # Retried once, after the backoff.
+    assert (await finnhub.quote("FLAKY"))["c"] == 100.0
+    assert stub.hits["FLAKY"] == 2
+
+    # Retried once, after the second Retry-After asks for instead of the backoff.
+    start = time.perf_counter()
+    assert (await finnhub.quote("LIMITED"))["c"] == 100.0
+    assert stub.hits["LIMITED"] == 2 and time.perf_counter() - start >= 1
+
+    # Every try times out.
+    error = await expect_error(finnhub, "SLOW")
+    assert stub.hits["SLOW"] == RETRIES + 1, error
+
+    # Not retried, the same request would get the same answer.
+    for symbol in ("HTML", "ERROR", "DENIED"):
+        error = await expect_error(finnhub, symbol)
+        assert stub.hits[symbol] == 1, error
+        print(f"{symbol:<7} {error}")
+
+    # Failed symbols are left out, the rest still come back.
+    quotes = await finnhub.quotes(["AAPL", "HTML", "MSFT", "AAPL", "DENIED"])
+    assert list(quotes) == ["AAPL", "MSFT"]
+    print("All checks passed.")
+
+
+async def main() -> None:
+    tickers = int(sys.argv[1]) if len(sys.argv) > 1 else TICKERS
+
+    stub = Stub()
+    app = web.Application()
+    app.router.add_get("/api/v1/quote", stub.quote)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    url = f"http://{host}:{port}"
+
+    try:
+        finnhub = Finnhub("stub", url, TIMEOUT, RETRIES, BACKOFF, 6000, 100)
+        try:
+            await check(finnhub, stub)
+        finally:
+            await finnhub.close()
+
+        # The first `BURST` go out at once, then one per token, 60 / RATE_LIMIT seconds apart.
+        stub.latency = LATENCY
+        finnhub = Finnhub("stub", url, rate_limit=RATE_LIMIT, burst=BURST)
+        try:
+            start = time.perf_counter()
+            quotes = await finnhub.quotes(f"T{i}" for i in range(tickers))
+            seconds = time.perf_counter() - start
+        finally:
+            await finnhub.close()
+        assert len(quotes) == tickers
+        print(
+            f"{tickers} quotes at {RATE_LIMIT}/min in bursts of {BURST},",
+            f"{LATENCY * 1000:.0f}ms each: {seconds:.1f}s",
+        )
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
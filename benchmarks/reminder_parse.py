@@ -0,0 +1,80 @@
+"""Per-call latency of parsing reminder times, before and after sharing the parser.
+
+Compares building a Calendar for every call, as `remind make` used to, with the shared
+Calendar and with `tools.dateparse.parse`, which answers common relative phrases from
+a memoized fast path. Also checks the fast path agrees with the Calendar.
+
+Run from the repository root:
+    python benchmarks/reminder_parse.py
+"""
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parsedatetime.parsedatetime as pdt  # noqa: E402
+
+from tools import dateparse  # noqa: E402
+
+# Times as users type them, most are simple relative phrases.
+PHRASES = [
+    "1 day",
+    "2 hours",
+    "30 mins",
+    "1 week",
+    "10 minutes",
+    "3d",
+    "5m",
+    "45 seconds",
+    "tomorrow",
+    "next friday at 5pm",
+    "1 month",
+    "2 Days",
+]
+SOURCE = datetime(2021, 3, 4, 12, 30, 15, 123456)
+NUMBER = 2000
+
+
+def new_calendar() -> None:
+    for phrase in PHRASES:
+        pdt.Calendar().parse(phrase, SOURCE)
+
+
+def shared_calendar() -> None:
+    for phrase in PHRASES:
+        dateparse.CALENDAR.parse(phrase, SOURCE)
+
+
+def fast_path() -> None:
+    for phrase in PHRASES:
+        dateparse.parse(phrase, SOURCE)
+
+
+def check() -> None:
+    """Fail if the fast path disagrees with the Calendar on any phrase."""
+    for phrase in PHRASES:
+        expected = dateparse.CALENDAR.parse(phrase, SOURCE)
+        actual = dateparse.parse(phrase, SOURCE)
+        assert tuple(expected[0])[:6] == tuple(actual[0])[:6], phrase
+        assert expected[1] == actual[1], phrase
+
+
+def main() -> None:
+    check()
+    calls = NUMBER * len(PHRASES)
+    baseline = None
+    for name, func in (
+        ("Calendar per call", new_calendar),
+        ("Shared Calendar", shared_calendar),
+        ("Shared + fast path", fast_path),
+    ):
+        seconds = min(timeit.repeat(func, number=NUMBER, repeat=5))
+        per_call = seconds / calls * 1e6
+        baseline = baseline or per_call
+        print(f"{name:<20} {per_call:8.2f} µs/call  {baseline / per_call:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Return to player of the slot machine, exact and simulated.
+
+Works out the exact return and variance per coin bet by enumerating every outcome
+of `tools.slots`, then simulates millions of spins with NumPy to check it and
+times that against spinning one at a time like the `slot` command.
+The simulation needs NumPy, which the bot itself doesn't, `pip install numpy`.
+
+Run from the repository root:
+    python benchmarks/slots.py [spins]
+"""
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.slots import SlotMachine, machine  # noqa: E402
+
+SPINS = 10_000_000
+# Spins simulated at once, keeps memory to a few hundred MB.
+CHUNK = 1_000_000
+# Spins timed one at a time, it's slow.
+SINGLE_SPINS = 200_000
+
+
+def simulate(machine: SlotMachine, spins: int, seed: int = 0):
+    """Mean and variance of the payout per coin bet over `spins` random spins."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    cum_weights = [np.array(weights) for weights in machine.cum_weights]
+    payouts = np.array(machine.payouts, dtype=np.int64)
+    total = 0
+    total_squares = 0
+    for start in range(0, spins, CHUNK):
+        size = min(CHUNK, spins - start)
+        # Each reel's draws land on a symbol by its cumulative weight,
+        # then the reels' positions make up the outcome's number.
+        index = np.zeros(size, dtype=np.int64)
+        for weights in cum_weights:
+            draws = rng.integers(0, weights[-1], size)
+            index = index * len(weights) + np.searchsorted(weights, draws, "right")
+        pays = payouts[index]
+        total += int(pays.sum())
+        total_squares += int((pays * pays).sum())
+    mean = total / spins
+    return mean, total_squares / spins - mean * mean
+
+
+def main() -> None:
+    spins = int(sys.argv[1]) if len(sys.argv) > 1 else SPINS
+
+    mean, variance = machine.rtp()
+    print(f"Exact      RTP {mean:.4%}  variance {variance:.3f}", end="  ")
+    print(f"hit rate {machine.hit_rate():.2%}  outcomes {len(machine.payouts)}")
+
+    rng = random.Random(0)
+    start = time.perf_counter()
+    total = sum(machine.payout(machine.spin(rng)) for _ in range(SINGLE_SPINS))
+    single = (time.perf_counter() - start) / SINGLE_SPINS
+    print(
+        f"One by one RTP {total / SINGLE_SPINS:.4%}  over {SINGLE_SPINS:,} spins",
+        f"{single * 1e6:.2f} µs/spin",
+    )
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("NumPy isn't installed, skipping the simulation.")
+        return
+
+    start = time.perf_counter()
+    simulated, simulated_variance = simulate(machine, spins)
+    seconds = time.perf_counter() - start
+    # Standard error of the simulated mean, it should be within a few of the exact one.
+    error = math.sqrt(variance / spins)
+    print(
+        f"Simulated  RTP {simulated:.4%}  variance {simulated_variance:.3f}",
+        f"over {spins:,} spins in {seconds:.2f}s",
+        f"{seconds / spins * 1e6:.3f} µs/spin",
+        f"({(simulated - mean) / error:+.1f} standard errors)",
+    )
+
+
+if __name__ == "__main__":
+    main()
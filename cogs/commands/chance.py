@@ -1,25 +1,82 @@
 import logging
-import random
 import asyncio
-import time
-from typing import Union
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Union
 
 import discord
 from discord.ext import commands
 from discord.ext.commands import Cog, Bot, Context, BucketType
 
-from tools import embeds, record
-from tools.bank import Bank
+from tools import connect4, embeds, record, slots
+from tools.bank import Bank, InsufficientFunds, ledger
+from tools.rng import GameRNG
+from tools.sessions import sessions
 import constants
 
 log = logging.getLogger(__name__)
 
+# Moves the Connect Four bot looks ahead at each difficulty, see `connect4` in config-default.yml.
+AI_DEPTH = constants.Connect4.ai_depth
+# Most seconds the bot thinks about a move before playing the best it found.
+AI_MOVE_SECONDS = constants.Connect4.ai_move_seconds
+
+# Least seconds between two edits of a game's message, Discord rate limits edits.
+EDIT_INTERVAL = 0.5
+
+
+class EditPacer:
+    """Paces the edits of one message, so game animations wait with `await` instead of
+    blocking the whole bot with `time.sleep`.
+
+    Edits are applied in order, at least `interval` seconds apart, so every game
+    keeps under Discord's rate limit while other games and commands carry on.
+
+    Example:
+        >pacer = EditPacer(message)
+        >await pacer.edit(embed=rolling, hold=2)  # Shown for at least 2 seconds.
+        >await pacer.edit(embed=result)
+    """
+
+    def __init__(self, message: discord.Message, interval: float = EDIT_INTERVAL):
+        self.message = message
+        self.interval = interval
+        # Event loop time the next edit may be made at.
+        self._next: float = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def edit(self, hold: float = 0.0, **fields) -> None:
+        """Edit the message once the previous edit has been shown long enough.
+
+        `hold` keeps this edit on screen for at least that many seconds.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.message.edit(**fields)
+            self._next = loop.time() + max(self.interval, hold)
+
 
 class Chance(Cog):
     """Chance"""
 
     def __init__(self, bot: Bot):
         self.bot = bot
+        # Searches the bot's Connect Four moves, started with the first game against it.
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+    def cog_unload(self) -> None:
+        # Payouts are deferred, start writing them now. cog_unload can't wait for the
+        # flush, but the ledger outlives the cog and `ledger.close()` in raphael.py
+        # writes whatever is left when the bot shuts down.
+        ledger.schedule_flush()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
 
     @commands.before_invoke(record.record_usage)
     @commands.bot_has_permissions(embed_links=True, read_message_history=True)
@@ -37,10 +94,13 @@ class Chance(Cog):
                 ctx=ctx, description="Too many dice, try again in smaller batches."
             )
             return
-        dice = [
-            int(random.choice(range(1, number_of_sides + 1)))
-            for _ in range(number_of_dice)
-        ]
+        if number_of_sides < 1:
+            await embeds.error_message(
+                ctx=ctx, description="Dice need at least one side."
+            )
+            return
+        # Nothing is bet, so there's no seed to commit to.
+        dice = [random.randint(1, number_of_sides) for _ in range(number_of_dice)]
         embed = embeds.make_embed(
             ctx=ctx,
             description=(", ".join(str(x) for x in dice)),
@@ -56,11 +116,9 @@ class Chance(Cog):
     async def flip(self, ctx: Context):
         """Simulates flipping a coin."""
 
-        coin = [str(random.choice(["Heads", "Tails"]))]
+        coin = random.choice(["Heads", "Tails"])
 
-        embed = embeds.make_embed(
-            ctx=ctx, description=coin[0], title="Coin Flip Results"
-        )
+        embed = embeds.make_embed(ctx=ctx, description=coin, title="Coin Flip Results")
         await ctx.reply(embed=embed)
 
     @commands.before_invoke(record.record_usage)
@@ -87,10 +145,16 @@ class Chance(Cog):
             )
             return
 
-        if (bank := Bank(ctx.author)) < bet:
+        # Every draw of this game comes from one seed, its hash is shown until the game ends.
+        rng = GameRNG("cups")
+        try:
+            bank, _ = await Bank.transfer(
+                ctx.author, None, bet, "Cups game", seed=rng.server_seed
+            )
+        except InsufficientFunds:
             await embeds.error_message(
                 ctx=ctx,
-                description=f"You can't bet more than you have\n{str(bank)}",
+                description=f"You can't bet more than you have\n{str(await Bank(ctx.author))}",
             )
             return
 
@@ -103,15 +167,14 @@ class Chance(Cog):
         CROSS_EMOJI = constants.Emojis.cross_mark  # [:x:]
 
         def check(
-            reaction: discord.Reaction, user: Union[discord.Member, discord.User]
+            reaction: discord.RawReactionActionEvent,
+            user: Union[discord.Member, discord.User],
         ) -> bool:
             """Checks if reaction is from author & is applicable to game"""
             foo = all(
                 (
                     # Checking if user who used a reaction, was the same user who issued the command.
                     user == bank.user,
-                    # Checking the reaction was to the same message as the slot machine embed.
-                    reaction.message.id == message.id,
                     # Checking if the reaction emoji is applicable to the slot machine commands.
                     str(reaction.emoji)
                     in [
@@ -134,19 +197,20 @@ class Chance(Cog):
             )
             embed.add_field(name=f"{CUP_EMOJI} {CUP_EMOJI} {CUP_EMOJI}", value="​")
             embed.set_footer(
-                text=f"Bet: {bet}\nChoices: {ONE_EMOJI} {TWO_EMOJI} {THREE_EMOJI}"
+                text=f"Bet: {bet}\nChoices: {ONE_EMOJI} {TWO_EMOJI} {THREE_EMOJI}\n"
+                f"Hash: {rng.seed_hash}"
             )
             if message is None:
                 return await ctx.reply(embed=embed)
             else:
-                await message.edit(embed=embed)
+                await pacer.edit(embed=embed)
 
         def check_win(choice: int, elements: list) -> bool:
             return elements[choice - 1] == COIN_EMOJI
 
         async def spin(bet: int, choice: int) -> int:
 
-            elements = random.choices(choices_config)[0]  # picking random option
+            elements = rng.choice(choices_config)  # picking random option
             log.debug(f"{ctx.author}, options: {elements}")
 
             if check_win(choice, elements):
@@ -166,13 +230,16 @@ class Chance(Cog):
                 )
                 bet = 0
 
+            # The game is over once it's lost, so the seed can be revealed.
+            proof = f"Hash: {rng.seed_hash}" if bet else f"Seed: {rng.server_seed}"
             embed.set_footer(
-                text=f"Risking: {bet} \nChoices: {ONE_EMOJI} {TWO_EMOJI} {THREE_EMOJI}"
+                text=f"Risking: {bet} \nChoices: {ONE_EMOJI} {TWO_EMOJI} {THREE_EMOJI}\n"
+                f"{proof}"
             )
             log.trace("cups, Sending embed")
-            await message.edit(embed=embed)
+            # Show the result for a moment before putting the cups back.
+            await pacer.edit(embed=embed, hold=2)
             if bet != 0:
-                time.sleep(2)
                 await default_embed(message, bet)
             return bet
 
@@ -187,8 +254,9 @@ class Chance(Cog):
                     title="Cups",
                     description=f"Awarded {bet} :coin:",
                 )
-                bank.add(bet, "Cups game")
-                await message.edit(embed=emb)
+                emb.set_footer(text=f"Seed: {rng.server_seed}")
+                await bank.add(bet, "Cups game", defer=True)
+                await pacer.edit(embed=emb)
                 return
 
         choices_config = [
@@ -197,49 +265,49 @@ class Chance(Cog):
             [CROSS_EMOJI, CROSS_EMOJI, COIN_EMOJI],
         ]
 
-        bal = float(bank.subtract(bet, "Cups game"))
+        bal = float(bank)
 
         message = await default_embed(None, bet)
         # getting the message object for editing and reacting
+        pacer = EditPacer(message)
 
         # Adding reactions to act like buttons
         for emoji in [ONE_EMOJI, TWO_EMOJI, THREE_EMOJI, CASH_EMOJI]:
             await message.add_reaction(emoji)
 
-        while True:
-            try:
-                reaction, user = await self.bot.wait_for(
-                    "reaction_add", timeout=60, check=check
-                )
-                # waiting for a reaction to be added - times out after x seconds, 60 in this example
+        with sessions.open(message, check) as session:
+            while True:
+                try:
+                    reaction, user = await session.wait(timeout=60)
+                    # waiting for a reaction to be added - times out after x seconds, 60 in this example
 
-                if str(reaction.emoji) == ONE_EMOJI and bet > 0:
-                    bet = await spin(bet, choice=1)
-                    await message.remove_reaction(reaction, user)
+                    if str(reaction.emoji) == ONE_EMOJI and bet > 0:
+                        bet = await spin(bet, choice=1)
+                        await message.remove_reaction(reaction.emoji, user)
 
-                elif str(reaction.emoji) == TWO_EMOJI and bet > 0:
-                    bet = await spin(bet, choice=2)
-                    await message.remove_reaction(reaction, user)
+                    elif str(reaction.emoji) == TWO_EMOJI and bet > 0:
+                        bet = await spin(bet, choice=2)
+                        await message.remove_reaction(reaction.emoji, user)
 
-                elif str(reaction.emoji) == THREE_EMOJI and bet > 0:
-                    bet = await spin(bet, choice=3)
-                    await message.remove_reaction(reaction, user)
+                    elif str(reaction.emoji) == THREE_EMOJI and bet > 0:
+                        bet = await spin(bet, choice=3)
+                        await message.remove_reaction(reaction.emoji, user)
 
-                elif str(reaction.emoji) == CASH_EMOJI:
-                    await cash_out(message=message, bet=bet, bal=bal)
-                    return
+                    elif str(reaction.emoji) == CASH_EMOJI:
+                        await cash_out(message=message, bet=bet, bal=bal)
+                        return
+
+                    else:
+                        await message.remove_reaction(reaction.emoji, user)
 
-                else:
-                    await message.remove_reaction(reaction, user)
+                    if bet == 0:
+                        await cash_out(message=message, bet=bet, bal=bal)
+                        return
 
-                if bet == 0:
+                except asyncio.TimeoutError:  # ending the loop if user doesn't react after x seconds
                     await cash_out(message=message, bet=bet, bal=bal)
                     return
 
-            except asyncio.TimeoutError:  # ending the loop if user doesn't react after x seconds
-                await cash_out(message=message, bet=bet, bal=bal)
-                return
-
     @commands.before_invoke(record.record_usage)
     @commands.bot_has_permissions(
         manage_messages=True,
@@ -252,42 +320,23 @@ class Chance(Cog):
     @commands.guild_only()
     @commands.max_concurrency(number=1, per=BucketType.user, wait=False)
     @commands.max_concurrency(number=4, per=BucketType.default, wait=False)
-    @commands.command(name="connect4", aliases=["4", "connect"])
+    @commands.group(
+        name="connect4", aliases=["4", "connect"], invoke_without_command=True
+    )
     async def connect(self, ctx: Context, bet: int = 0):
         """
         Connect four checkers in a row, pillar, or diagonal first to win.
-        """
-        # setting global emoji's that will be used in the program
-        ONE_EMOJI = constants.Emojis.number_one
-        TWO_EMOJI = constants.Emojis.number_two
-        THREE_EMOJI = constants.Emojis.number_three
-        FOUR_EMOJI = constants.Emojis.number_four
-        FIVE_EMOJI = constants.Emojis.number_five
-        SIX_EMOJI = constants.Emojis.number_six
-        SEVEN_EMOJI = constants.Emojis.number_seven
-        RED_CIRCLE = constants.Emojis.red_circle
-        YELLOW_CIRCLE = constants.Emojis.yellow_circle
-        BLACK_CIRCLE = constants.Emojis.black_circle
-        REACTIONS = [
-            ONE_EMOJI,
-            TWO_EMOJI,
-            THREE_EMOJI,
-            FOUR_EMOJI,
-            FIVE_EMOJI,
-            SIX_EMOJI,
-            SEVEN_EMOJI,
-        ]
-        BOTTOM = (
-            f":black_large_square:{ONE_EMOJI}{TWO_EMOJI}{THREE_EMOJI}{FOUR_EMOJI}"
-            f"{FIVE_EMOJI}{SIX_EMOJI}{SEVEN_EMOJI}"
-        )
 
-        if bet and bet > Bank(ctx.author):
+        Use `connect4 ai [easy|medium|hard]` to play against the bot instead.
+        """
+        try:
+            if bet:
+                await Bank.transfer(ctx.author, None, bet, "Connect Four Game")
+        except InsufficientFunds:
             await embeds.error_message(
                 ctx=ctx, description="You do not have enough coin to bet that much"
             )
             return
-        Bank(ctx.author).subtract(bet)
 
         """Need to find another player to play against. Polling the server"""
         embed = embeds.make_embed(
@@ -307,137 +356,157 @@ class Chance(Cog):
 
             # Checking if user who used a reaction, was the same user who issued the command
             author_check = not user.bot
-            # Checking the reaction was to the same message as the command embed
-            message_check = reaction.message.id == message.id
             # Checking if the reaction emoji is applicable to the command embed
             reaction_check = str(reaction.emoji) in ["▶️", "🛑"]
 
-            if x := (author_check and message_check and reaction_check):
+            if x := (author_check and reaction_check):
                 # logging the action in case something breaks in the future
                 log.trace(f"{user.name=} accepted to play connect 4 {reaction.emoji=}")
             return x
 
-        while True:
-            try:
-                reaction, user = await self.bot.wait_for(
-                    "reaction_add", timeout=60, check=check_start
-                )
-                # waiting for a reaction to be added - times out after x seconds, 60 in this example
-
-                if (
-                    bet == 0
-                    or bet < (bal := Bank(user))
-                    and str(reaction.emoji) == "▶️"
-                ):
-                    Bank(user).subtract(bet)
-                    players = {RED_CIRCLE: ctx.author, YELLOW_CIRCLE: user}
-                    await message.clear_reactions()
-                    break
-                elif str(reaction.emoji) == "🛑" and ctx.author == user:
-                    Bank(ctx.author).add(bet)
+        with sessions.open(message, check_start) as session:
+            while True:
+                try:
+                    reaction, user = await session.wait(timeout=60)
+                    # waiting for a reaction to be added - times out after x seconds, 60 in this example
+
+                    if str(reaction.emoji) == "▶️":
+                        try:
+                            if bet:
+                                await Bank.transfer(
+                                    user, None, bet, "Connect Four Game"
+                                )
+                        except InsufficientFunds:
+                            await embeds.warning_message(
+                                ctx,
+                                f"Sorry, {user.display_name}, you do not have enough coin to join in on the bet.",
+                                False,
+                            )
+                            continue
+                        players = [ctx.author, user]
+                        await message.clear_reactions()
+                        break
+                    elif str(reaction.emoji) == "🛑" and ctx.author == user:
+                        await Bank(ctx.author).add(bet, defer=True)
+                        try:
+                            await message.delete()
+                        except discord.NotFound:
+                            pass
+                        return
+                    else:
+                        await message.remove_reaction(reaction.emoji, user)
+                # removes reactions if the user tries to go forward on the last page or
+                # backwards on the first page
+                except asyncio.TimeoutError:
+                    await Bank(ctx.author).add(bet, defer=True)
                     try:
-                        await message.delete()
+                        await message.clear_reactions()
                     except discord.NotFound:
-                        pass
+                        await embeds.warning_message(
+                            ctx,
+                            "Request message was deleted unexpectedly or can no longer be found\n"
+                            f"{ctx.author.mention}'s money has been returned",
+                        )
+                        log.warning(
+                            msg="Connect4, message to play was deleted unexpectedly"
+                        )
                     return
-                elif bet > bal:
-                    await embeds.warning_message(
-                        ctx,
-                        f"Sorry, {user.display_name}, you do not have enough coin to join in on the bet.",
-                        False,
-                    )
-                else:
-                    await message.remove_reaction(reaction, user)
-            # removes reactions if the user tries to go forward on the last page or
-            # backwards on the first page
-            except asyncio.TimeoutError:
-                Bank(ctx.author).add(bet)
-                try:
-                    await message.clear_reactions()
-                except discord.NotFound:
-                    await embeds.warning_message(
-                        ctx,
-                        "Request message was deleted unexpectedly or can no longer be found\n"
-                        f"{ctx.author.mention}'s money has been returned",
-                    )
-                    log.warning(
-                        msg="Connect4, message to play was deleted unexpectedly"
-                    )
-                return
-                # ending the loop if user doesn't react after x seconds
+                    # ending the loop if user doesn't react after x seconds
+
+        await self.connect4_game(ctx, message, players, bet)
+
+    @commands.before_invoke(record.record_usage)
+    @commands.bot_has_permissions(
+        manage_messages=True,
+        add_reactions=True,
+        embed_links=True,
+        external_emojis=True,
+        use_external_emojis=True,
+        read_message_history=True,
+    )
+    @commands.guild_only()
+    @commands.max_concurrency(number=1, per=BucketType.user, wait=False)
+    @commands.max_concurrency(number=4, per=BucketType.default, wait=False)
+    @connect.command(name="ai", aliases=["bot"])
+    async def connect_ai(self, ctx: Context, difficulty: str = "medium"):
+        """
+        Play Connect Four against the bot, you move first.
+        """
+        depth = AI_DEPTH.get(difficulty.lower())
+        if depth is None:
+            await embeds.error_message(
+                ctx=ctx,
+                description=f"Difficulty must be one of: {', '.join(AI_DEPTH)}",
+            )
+            return
+
+        embed = embeds.make_embed(
+            ctx=ctx, title="Connect Four", description="Setting up the board"
+        )
+        message = await ctx.reply(embed=embed)
+        await self.connect4_game(ctx, message, [ctx.author, self.bot.user], 0, depth)
+
+    async def connect4_move(self, board: connect4.Board, depth: int) -> int:
+        """The bot's move, searched in a separate process so the bot keeps running."""
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=constants.Connect4.ai_workers)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.pool, connect4.best_move, board, depth, AI_MOVE_SECONDS
+        )
+
+    async def connect4_game(
+        self,
+        ctx: Context,
+        message: discord.Message,
+        players: list,
+        bet: int,
+        depth: int = None,
+    ) -> None:
+        """Plays a game of Connect Four on `message`, the first player is red and moves first.
+
+        When the bot is one of the players it searches `depth` moves ahead for its moves.
+        """
+        # setting global emoji's that will be used in the program
+        ONE_EMOJI = constants.Emojis.number_one
+        TWO_EMOJI = constants.Emojis.number_two
+        THREE_EMOJI = constants.Emojis.number_three
+        FOUR_EMOJI = constants.Emojis.number_four
+        FIVE_EMOJI = constants.Emojis.number_five
+        SIX_EMOJI = constants.Emojis.number_six
+        SEVEN_EMOJI = constants.Emojis.number_seven
+        RED_CIRCLE = constants.Emojis.red_circle
+        YELLOW_CIRCLE = constants.Emojis.yellow_circle
+        BLACK_CIRCLE = constants.Emojis.black_circle
+        REACTIONS = [
+            ONE_EMOJI,
+            TWO_EMOJI,
+            THREE_EMOJI,
+            FOUR_EMOJI,
+            FIVE_EMOJI,
+            SIX_EMOJI,
+            SEVEN_EMOJI,
+        ]
+        BOTTOM = (
+            f":black_large_square:{ONE_EMOJI}{TWO_EMOJI}{THREE_EMOJI}{FOUR_EMOJI}"
+            f"{FIVE_EMOJI}{SIX_EMOJI}{SEVEN_EMOJI}"
+        )
 
         """Setting up the game"""
+        # Red moves first, as player 0 of the board.
+        PIECES = [RED_CIRCLE, YELLOW_CIRCLE]
+        players = dict(zip(PIECES, players))
 
-        def check_win(board: list, player) -> bool:
-            # Check horizontal locations for win
-            for column in range(6 - 3):
-                for row in range(7):
-                    try:
-                        if (
-                            board[row][column] == player
-                            and board[row][column + 1] == player
-                            and board[row][column + 2] == player
-                            and board[row][column + 3] == player
-                        ):
-                            return True
-                    except IndexError:
-                        continue
-
-            # Check vertical locations for win
-            for column in range(6):
-                for row in range(7 - 3):
-                    try:
-                        if (
-                            board[row][column] == player
-                            and board[row + 1][column] == player
-                            and board[row + 2][column] == player
-                            and board[row + 3][column] == player
-                        ):
-                            return True
-                    except IndexError:
-                        continue
-
-            # Check positively sloped diagonals
-            for column in range(6 - 3):
-                for row in range(7 - 3):
-                    try:
-                        if (
-                            board[row][column] == player
-                            and board[row + 1][column + 1] == player
-                            and board[row + 2][column + 2] == player
-                            and board[row + 3][column + 3] == player
-                        ):
-                            return True
-                    except IndexError:
-                        continue
-
-            # Check negatively sloped diagonals
-            for column in range(6 - 3):
-                for row in range(3, 7):
-                    try:
-                        if (
-                            board[row][column] == player
-                            and board[row - 1][column + 1] == player
-                            and board[row - 2][column + 2] == player
-                            and board[row - 3][column + 3] == player
-                        ):
-                            return True
-                    except IndexError:
-                        continue
-            return False
-
-        def column(a: list, column: int) -> list:
+        def row(board: connect4.Board, row: int) -> str:
             result = ""
-            for num in range(7):
-                try:
-                    result += a[num][column]
-                except IndexError:
-                    result += BLACK_CIRCLE
+            for column in range(connect4.WIDTH):
+                player = board.cell(column, row)
+                result += BLACK_CIRCLE if player is None else PIECES[player]
             return result
 
         async def print_board(
             message: discord.Message = None,
-            board: list = [[], [], [], [], [], [], []],
+            board: connect4.Board = None,
             turn=YELLOW_CIRCLE,
             win: bool = False,
         ) -> (tuple):
@@ -453,13 +522,11 @@ class Chance(Cog):
                 color = 0xFF0000
             embed = discord.Embed(
                 title="Connect Four",
-                description=f":arrow_forward:{column(board, 5)}\n"
-                f":arrow_forward:{column(board, 4)}\n"
-                f":arrow_forward:{column(board, 3)}\n"
-                f":arrow_forward:{column(board, 2)}\n"
-                f":arrow_forward:{column(board, 1)}\n"
-                f":arrow_forward:{column(board, 0)}\n"
-                f"{BOTTOM}",
+                description="".join(
+                    f":arrow_forward:{row(board, x)}\n"
+                    for x in reversed(range(connect4.HEIGHT))
+                )
+                + BOTTOM,
                 colour=color,
             )
             embed.set_thumbnail(
@@ -483,9 +550,9 @@ class Chance(Cog):
                         value=f"{bet:,} awarded to {winner.mention}\n"
                         f"{loser.mention} walks away in shame and with their pockets a little lighter",
                     )
-                    Bank(winner).add(bet * 2, "Connect Four Game")
+                    await Bank(winner).add(bet * 2, "Connect Four Game", defer=True)
 
-            elif (sum(len(row) for row in board)) == 42:
+            elif board.is_full():
                 # If this is true then the game is a tie.
                 first = players.pop(turn)
                 second = players.popitem()[1]
@@ -500,8 +567,8 @@ class Chance(Cog):
                         value=f"bet has been refunded to {first.mention} and {second.mention}\n"
                         f"Good game",
                     )
-                    Bank(first).add(bet)
-                    Bank(second).add(bet)
+                    await Bank(first).add(bet, defer=True)
+                    await Bank(second).add(bet, defer=True)
 
             if turn == RED_CIRCLE and not win and players != {}:
                 turn = YELLOW_CIRCLE
@@ -519,7 +586,7 @@ class Chance(Cog):
             await message.edit(embed=embed)
             return turn
 
-        board: list = [[], [], [], [], [], [], []]
+        board = connect4.Board()
         turn = await print_board(message=message, board=board)
 
         for emoji in REACTIONS:
@@ -530,139 +597,65 @@ class Chance(Cog):
 
             # Checking if user who used a reaction, was the same user who issued the command
             author_check = not user.bot and user == players[turn]
-            # Checking the reaction was to the same message as the command embed
-            message_check = reaction.message.id == message.id
             # Checking if the reaction emoji is applicable to the command embed
             reaction_check = str(reaction.emoji) in REACTIONS
 
-            if x := (author_check and message_check and reaction_check):
+            if x := (author_check and reaction_check):
                 # logging the action in case something breaks in the future
                 log.trace(f"{user.name=} reacted with {reaction.emoji=} in connect 4")
             return x
 
-        while True:
-            try:
-                reaction, user = await self.bot.wait_for(
-                    "reaction_add", timeout=90, check=check
-                )
-                # waiting for a reaction to be added - times out after x seconds, 120 in this example
-
-                if str(reaction.emoji) == ONE_EMOJI and len(board[0]) < 6:
-                    board[0].append(turn)
-                    turn = await print_board(
-                        message=message,
-                        board=board,
-                        turn=turn,
-                        win=(win := check_win(board, turn)),
-                    )
-                    await message.remove_reaction(reaction, user)
-                    if win:
-                        await message.clear_reactions()
-                        break
-
-                elif str(reaction.emoji) == TWO_EMOJI and len(board[1]) < 6:
-                    board[1].append(turn)
-                    turn = await print_board(
-                        message=message,
-                        board=board,
-                        turn=turn,
-                        win=(win := check_win(board, turn)),
-                    )
-                    await message.remove_reaction(reaction, user)
-                    if win:
-                        await message.clear_reactions()
-                        break
-
-                elif str(reaction.emoji) == THREE_EMOJI and len(board[2]) < 6:
-                    board[2].append(turn)
-                    turn = await print_board(
-                        message=message,
-                        board=board,
-                        turn=turn,
-                        win=(win := check_win(board, turn)),
-                    )
-                    await message.remove_reaction(reaction, user)
-                    if win:
-                        await message.clear_reactions()
-                        break
-
-                elif str(reaction.emoji) == FOUR_EMOJI and len(board[3]) < 6:
-                    board[3].append(turn)
-                    turn = await print_board(
-                        message=message,
-                        board=board,
-                        turn=turn,
-                        win=(win := check_win(board, turn)),
-                    )
-                    await message.remove_reaction(reaction, user)
-                    if win:
-                        await message.clear_reactions()
-                        break
-
-                elif str(reaction.emoji) == FIVE_EMOJI and len(board[4]) < 6:
-                    board[4].append(turn)
-                    turn = await print_board(
-                        message=message,
-                        board=board,
-                        turn=turn,
-                        win=(win := check_win(board, turn)),
-                    )
-                    await message.remove_reaction(reaction, user)
-                    if win:
-                        await message.clear_reactions()
-                        break
+        with sessions.open(message, check) as session:
+            while True:
+                try:
+                    if players[turn] == self.bot.user:
+                        reaction = None
+                        column = await self.connect4_move(board, depth)
+                    else:
+                        reaction, user = await session.wait(timeout=90)
+                        # waiting for a reaction to be added - times out after x seconds, 120 in this example
+                        column = REACTIONS.index(str(reaction.emoji))
+
+                    if board.can_play(column):
+                        win = board.play(column)
+                        turn = await print_board(
+                            message=message, board=board, turn=turn, win=win
+                        )
+                        if reaction is not None:
+                            await message.remove_reaction(reaction.emoji, user)
+                        if win:
+                            await message.clear_reactions()
+                            break
+                    else:
+                        await message.remove_reaction(reaction.emoji, user)
 
-                elif str(reaction.emoji) == SIX_EMOJI and len(board[5]) < 6:
-                    board[5].append(turn)
-                    turn = await print_board(
-                        message=message,
-                        board=board,
-                        turn=turn,
-                        win=(win := check_win(board, turn)),
-                    )
-                    await message.remove_reaction(reaction, user)
-                    if win:
-                        await message.clear_reactions()
-                        break
+                    if board.is_full():
+                        return
 
-                elif str(reaction.emoji) == SEVEN_EMOJI and len(board[6]) < 6:
-                    board[6].append(turn)
-                    turn = await print_board(
-                        message=message,
-                        board=board,
-                        turn=turn,
-                        win=(win := check_win(board, turn)),
-                    )
-                    await message.remove_reaction(reaction, user)
-                    if win:
+                except asyncio.TimeoutError:  # ending the loop if user doesn't react after x seconds
+                    if turn == RED_CIRCLE:
+                        turn = YELLOW_CIRCLE
+                    else:
+                        turn = RED_CIRCLE
+                    try:
                         await message.clear_reactions()
-                        break
-
-                else:
-                    await message.remove_reaction(reaction, user)
-
-                if (sum(len(row) for row in board)) == 42:
-                    return
-
-            except asyncio.TimeoutError:  # ending the loop if user doesn't react after x seconds
-                if turn == RED_CIRCLE:
-                    turn = YELLOW_CIRCLE
-                else:
-                    turn = RED_CIRCLE
-                try:
-                    await message.clear_reactions()
-                    await print_board(message=message, board=board, turn=turn, win=True)
-                except discord.NotFound:  # When the embed for the game has been removed. Refund players
-                    await embeds.warning_message(
-                        ctx,
-                        "Game was deleted unexpectedly or can no longer be found\n"
-                        f"Bet has been refunded for players {players[RED_CIRCLE].mention} "
-                        f"and {players[YELLOW_CIRCLE].mention}",
-                    )
-                    Bank(players[RED_CIRCLE]).add(bet)
-                    Bank(players[YELLOW_CIRCLE]).add(bet)
-                    log.warning("Connect4, message to play was deleted unexpectedly")
-                break
+                        await print_board(
+                            message=message, board=board, turn=turn, win=True
+                        )
+                    except discord.NotFound:  # When the embed for the game has been removed. Refund players
+                        await embeds.warning_message(
+                            ctx,
+                            "Game was deleted unexpectedly or can no longer be found\n"
+                            f"Bet has been refunded for players {players[RED_CIRCLE].mention} "
+                            f"and {players[YELLOW_CIRCLE].mention}",
+                        )
+                        if bet:
+                            await Bank(players[RED_CIRCLE]).add(bet, defer=True)
+                            await Bank(players[YELLOW_CIRCLE]).add(bet, defer=True)
+                        log.warning(
+                            "Connect4, message to play was deleted unexpectedly"
+                        )
+                    break
 
     @commands.before_invoke(record.record_usage)
     @commands.bot_has_permissions(
@@ -686,15 +679,19 @@ class Chance(Cog):
             )
             return
 
-        if (bal := Bank(ctx.author)) < credit:
+        # Every spin of this game comes from one seed, its hash is shown until cashing out.
+        rng = GameRNG("slots")
+        try:
+            await Bank.transfer(
+                ctx.author, None, credit, "Slot Machine", seed=rng.server_seed
+            )
+        except InsufficientFunds as e:
             await embeds.error_message(
                 ctx=ctx,
-                description=f"You do not have enough coin to bet that much\nYour balance: {bal}",
+                description=f"You do not have enough coin to bet that much\nYour balance: {e.balance}",
             )
             return
 
-        Bank(ctx.author).subtract(credit)
-
         start_credit = credit
 
         SEVEN = constants.Emojis.number_seven
@@ -713,44 +710,23 @@ class Chance(Cog):
         TEN = constants.Emojis.number_ten
         COIN = constants.Emojis.coin
 
-        reel1 = {
-            SEVEN: 1,
-            BAR: 4,
-            MELLON: 2,
-            BELL: 1,
-            PEACH: 9,
-            HONEY: 9,
-            CHERRY: 9,
-            LEMON: 5,
-        }
-        reel2 = {
-            SEVEN: 1,
-            BAR: 2,
-            MELLON: 2,
-            BELL: 8,
-            PEACH: 3,
-            HONEY: 13,
-            CHERRY: 4,
-            LEMON: 0,
-        }
-        reel3 = {
-            SEVEN: 1,
-            BAR: 1,
-            MELLON: 8,
-            BELL: 8,
-            PEACH: 3,
-            HONEY: 2,
-            CHERRY: 0,
-            LEMON: 10,
-        }
-
-        def check(reaction: str, user) -> bool:
+        # Emoji each of the slot machine's symbols is shown as.
+        SYMBOLS = dict(
+            seven=SEVEN,
+            bar=BAR,
+            mellon=MELLON,
+            bell=BELL,
+            peach=PEACH,
+            honey=HONEY,
+            cherry=CHERRY,
+            lemon=LEMON,
+        )
+
+        def check(reaction: discord.RawReactionActionEvent, user) -> bool:
             """Checks if reaction is from author & is applicable to slot machine"""
 
             # Checking if user who used a reaction, was the same user who issued the command
             author_check = user == ctx.author
-            # Checking the reaction was to the same message as the slot machine embed
-            message_check = reaction.message.id == message.id
             # Checking if the reaction emoji is applicable to the slot machine commands
             reaction_check = str(reaction.emoji) in [
                 LEVER,
@@ -761,73 +737,23 @@ class Chance(Cog):
                 BOMB,
             ]
 
-            if x := (author_check and message_check and reaction_check):
+            if x := (author_check and reaction_check):
                 # logging the action in case something breaks in the future
                 log.trace(
                     f"{ctx.author} reacted with {reaction.emoji=} in slot machine"
                 )
             return x
 
-        def take_random(reel: dict) -> str:
-            return random.choices(list(reel.keys()), weights=list(reel.values()), k=1)[
-                0
-            ]
-
-        def check_win(elements: list) -> int:
-            points = 0
-            element_dict = {}
-            for i in elements:  # converting list into dict for ease of comparing
-                if i in element_dict:
-                    element_dict[i] += 1
-                else:
-                    element_dict[i] = 1
-
-            if CHERRY in element_dict:
-                if element_dict[CHERRY] == 1:
-                    points = 2
-                else:
-                    points = 5
-            if HONEY in element_dict:
-                if (
-                    element_dict[HONEY] == 3
-                    or element_dict[HONEY] == 2
-                    and BAR in element_dict
-                ):
-                    points = 10
-            if PEACH in element_dict:
-                if (
-                    element_dict[PEACH] == 3
-                    or element_dict[PEACH] == 2
-                    and BAR in element_dict
-                ):
-                    points = 14
-            if BELL in element_dict:
-                if (
-                    element_dict[BELL] == 3
-                    or element_dict[BELL] == 2
-                    and BAR in element_dict
-                ):
-                    points = 18
-            if MELLON in element_dict:
-                if element_dict[MELLON] == 3:
-                    points = 100
-            if BAR in element_dict:
-                if element_dict[BAR] == 3:
-                    points = 125
-            if SEVEN in element_dict:
-                if element_dict[SEVEN] == 3:
-                    points = 200
+        def check_win(outcome: tuple) -> int:
+            points = slots.machine.payout(outcome)
             log.debug(f"{ctx.author=} won {points * bet} in slots!")
             return points * bet
 
         async def spin(credit: int) -> int:
             # this for loop isn't needed, it just show some flare like the icons are shuffling
-            for _ in range(3):
-                elements = [
-                    take_random(reel1),
-                    take_random(reel2),
-                    take_random(reel3),
-                ]  # picking three items
+            # the frames are drawn at once, the last one is the result.
+            for _, outcome in enumerate(slots.machine.spins(3, rng)):
+                elements = [SYMBOLS[symbol] for symbol in outcome]
 
                 embed = embeds.make_embed(
                     ctx=ctx,
@@ -836,7 +762,7 @@ class Chance(Cog):
                     image_url="https://i.imgur.com/SjYv07F.png",
                 )
 
-                if _ == 2 and (score := check_win(elements)):
+                if _ == 2 and (score := check_win(outcome)):
                     credit += score
                     embed = embeds.make_embed(
                         ctx=ctx,
@@ -855,12 +781,14 @@ class Chance(Cog):
                 # 📍: Spin • 💸: Cash Out
                 # 1️⃣, 5️⃣, 🔟: bet amount
                 embed.set_footer(
-                    text="📍: Spin • 💸: Cash Out\n" "1️⃣, 5️⃣, 🔟: bet amount"
+                    text="📍: Spin • 💸: Cash Out\n"
+                    "1️⃣, 5️⃣, 🔟: bet amount\n"
+                    f"Hash: {rng.seed_hash}"
                 )
                 embed.add_field(name="Credits", value=f"{credit:,} {COIN}", inline=True)
                 embed.add_field(name="Bet", value=f"{bet:,} {COIN}", inline=True)
-                await message.edit(embed=embed)
-                time.sleep(0.5)  # sleep because of rate limit
+                # Frames are shown at least EDIT_INTERVAL apart because of rate limit.
+                await pacer.edit(embed=embed)
 
             return credit
 
@@ -873,13 +801,16 @@ class Chance(Cog):
                 image_url="https://i.imgur.com/SjYv07F.png",
             )
             log.trace(f"{ctx.author=}, changed bet: {bet=}")
-            embed.set_footer(text="📍: Spin • 💸: Cash Out\n1️⃣, 5️⃣, 🔟: bet amount")
+            embed.set_footer(
+                text="📍: Spin • 💸: Cash Out\n1️⃣, 5️⃣, 🔟: bet amount\n"
+                f"Hash: {rng.seed_hash}"
+            )
             embed.add_field(name="Credits", value=f"{credit:,} {COIN}", inline=True)
             embed.add_field(name="Bet", value=f"{bet:,} {COIN}", inline=True)
 
             if send:
                 return await ctx.reply(embed=embed)
-            return await message.edit(embed=embed)
+            await pacer.edit(embed=embed)
 
         async def cash_out(credit):
 
@@ -891,77 +822,78 @@ class Chance(Cog):
                 title="Cashing Out",
                 description=f"**Credits**: \t**``{credit:,} {COIN}``**\n"
                 f"**Net**: \t**``{credit-start_credit:,}{COIN}``**\n"
-                f"**Bank**: \t**``{Bank(ctx.author).add(credit, 'Slot Machine'):,} {COIN}``**",
+                f"**Bank**: \t**``{await Bank(ctx.author).add(credit, 'Slot Machine', defer=True):,} {COIN}``**",
                 image_url="https://i.imgur.com/SjYv07F.png",
             )
+            embed.set_footer(text=f"Seed: {rng.server_seed}\nHash: {rng.seed_hash}")
 
             log.trace("slot_machine, cash_out: sending message")
-            await message.edit(embed=embed)
+            await pacer.edit(embed=embed)
 
         bet = 1
         message = await change_bet(True)
+        pacer = EditPacer(message)
 
         # first adding reactions
         for react in [LEVER, ONE, FIVE, TEN, CASH_OUT]:
             await message.add_reaction(react)
 
-        while True:
-            try:
-                # This makes sure nobody except the command sender can interact with the "menu"
-                reaction, user = await self.bot.wait_for(
-                    "reaction_add", timeout=60, check=check
-                )
-                # waiting for a reaction to be added - times out after x seconds, 60 in this example
+        with sessions.open(message, check) as session:
+            while True:
+                try:
+                    # This makes sure nobody except the command sender can interact with the "menu"
+                    reaction, user = await session.wait(timeout=60)
+                    # waiting for a reaction to be added - times out after x seconds, 60 in this example
+
+                    await message.remove_reaction(reaction.emoji, user)
+
+                    if str(reaction.emoji) == LEVER:  # 📍
+                        if credit >= bet:
+                            credit -= bet
+                            credit = await spin(credit)
+
+                        else:
+                            pass
+                    elif str(reaction.emoji) == ONE:  # 1️⃣
+                        bet = 1
+                        await change_bet()
+                    elif str(reaction.emoji) == FIVE:  # 5️⃣
+                        bet = 5
+                        await change_bet()
+                    elif str(reaction.emoji) == TEN:  # 🔟
+                        bet = 10
+                        await change_bet()
+
+                    elif str(reaction.emoji) == CASH_OUT:  # 💸
+                        await cash_out(credit)
+                        break
 
-                await message.remove_reaction(reaction, user)
+                    elif str(reaction.emoji) == BOMB:  # 💣
+                        bal_left = float(await Bank(ctx.author))
+                        await Bank(ctx.author).subtract(bal_left)
+                        credit += bal_left
+                        bet = credit
 
-                if str(reaction.emoji) == LEVER:  # 📍
-                    if credit >= bet:
-                        credit -= bet
-                        credit = await spin(credit)
+                        await change_bet()
+                        log.warning(
+                            f"{ctx.author.mention=} has discovered and used the slot machine ALL IN easter egg"
+                        )
 
-                    else:
-                        pass
-                elif str(reaction.emoji) == ONE:  # 1️⃣
-                    bet = 1
-                    await change_bet()
-                elif str(reaction.emoji) == FIVE:  # 5️⃣
-                    bet = 5
-                    await change_bet()
-                elif str(reaction.emoji) == TEN:  # 🔟
-                    bet = 10
-                    await change_bet()
-
-                elif str(reaction.emoji) == CASH_OUT:  # 💸
-                    await cash_out(credit)
-                    break
-
-                elif str(reaction.emoji) == BOMB:  # 💣
-                    bal_left = float(Bank(ctx.author))
-                    Bank(ctx.author).subtract(bal_left)
-                    credit += bal_left
-                    bet = credit
-
-                    await change_bet()
-                    log.warning(
-                        f"{ctx.author.mention=} has discovered and used the slot machine ALL IN easter egg"
-                    )
+                    if credit == 0:
+                        await cash_out(credit)
+                        break
 
-                if credit == 0:
+                except asyncio.TimeoutError:
                     await cash_out(credit)
                     break
+                except Exception as exception:
+                    await embeds.error_message(
+                        ctx=ctx,
+                        description=f"An error occurred, balance refunded\n {exception=}",
+                    )
+                    await Bank(ctx.author).add(credit, defer=True)
 
-            except asyncio.TimeoutError:
-                await cash_out(credit)
-                break
-            except Exception as exception:
-                await embeds.error_message(
-                    ctx=ctx,
-                    description=f"An error occurred, balance refunded\n {exception=}",
-                )
-                Bank(ctx.author).add(credit)
-
-            # ending the loop if user doesn't react after x seconds
+                # ending the loop if user doesn't react after x seconds
 
 
 def setup(bot: Bot) -> None:
@@ -1,15 +1,22 @@
 import logging
+from datetime import datetime
 
 import discord
 from discord.ext import commands
 from discord.ext.commands import Cog, Bot, Context
 
-from tools import embeds, record
-from tools.bank import Bank
+from tools import embeds, positions, record
+from tools.bank import Bank, InsufficientFunds
 
 log = logging.getLogger(__name__)
 
 
+def snapshot_age(snapshot: datetime) -> str:
+    """Footer saying how old the stock prices behind a net worth are."""
+    minutes = (datetime.now() - snapshot).total_seconds() // 60
+    return f"Stock prices from {minutes:,.0f} minute(s) ago"
+
+
 class Economy(Cog):
     """Economy"""
 
@@ -31,11 +38,11 @@ class Economy(Cog):
 
         if user is ctx.author:
             embed.title = "Your Balance"
-            embed.description = f"{Bank(ctx.author):,.2f} :coin:"
+            embed.description = f"{await Bank(ctx.author):,.2f} :coin:"
 
         else:
             embed.title = "Their Balance"
-            embed.description = f"{user.mention} has {Bank(user):,.2f} :coin:"
+            embed.description = f"{user.mention} has {await Bank(user):,.2f} :coin:"
 
         await ctx.reply(embed=embed)
 
@@ -65,15 +72,19 @@ class Economy(Cog):
             )
             return
 
-        elif Bank(ctx.author) <= amount:
+        try:
+            await Bank.transfer(
+                ctx.author,
+                user,
+                amount,
+                f"Payment from {ctx.author.name} to {user.name}",
+            )
+        except InsufficientFunds:
             await embeds.error_message(
                 ctx=ctx, description="You cannot pay what you do not have."
             )
             return
 
-        Bank(ctx.author).subtract(amount, f"Payment to {user.name}")
-        Bank(user).add(amount, f"Payment from {user.name}")
-
         embed = embeds.make_embed(
             ctx=ctx,
             title="Payment",
@@ -84,6 +95,58 @@ class Economy(Cog):
         )
         await ctx.reply(embed=embed)
 
+    @commands.before_invoke(record.record_usage)
+    @commands.bot_has_permissions(embed_links=True)
+    @commands.command(name="networth", aliases=["net_worth", "nw"])
+    async def net_worth(self, ctx: Context, user: discord.User = None) -> None:
+        """Display a player's balance plus the value of their stocks."""
+
+        user = user or ctx.author
+
+        # Stocks are valued at the last price snapshot, no live quotes.
+        result = await positions.net_worths(limit=1, author_id=user.id)
+        stocks = result[0]["stocks"] if result else 0
+        balance = await Bank(user)
+
+        embed = embeds.make_embed(
+            ctx=ctx,
+            title="Net Worth",
+            description=f"{user.mention} is worth {float(balance) + stocks:,.2f} :coin:",
+        )
+        embed.add_field(name="Balance", value=f"{balance:,.2f} :coin:")
+        embed.add_field(name="Stocks", value=f"{stocks:,.2f} :coin:")
+        if result and result[0]["snapshot"]:
+            embed.set_footer(text=snapshot_age(result[0]["snapshot"]))
+        embed.set_thumbnail(
+            url="https://cdn.iconscout.com/icon/free/png-128/bank-1850789-1571030.png"
+        )
+        await ctx.reply(embed=embed)
+
+    @commands.before_invoke(record.record_usage)
+    @commands.bot_has_permissions(embed_links=True)
+    @commands.command(name="leaderboard", aliases=["lb", "top"])
+    async def leaderboard(self, ctx: Context) -> None:
+        """Display the richest players by net worth."""
+
+        result = await positions.net_worths(limit=10)
+
+        lines = [
+            f"**{rank}.** <@{x['author_id']}> {x['net_worth']:,.0f} :coin:"
+            for rank, x in enumerate(result, start=1)
+        ]
+        embed = embeds.make_embed(
+            ctx=ctx,
+            title="Leaderboard",
+            description="\n".join(lines) or "Nobody has any coin yet.",
+        )
+        snapshots = [x["snapshot"] for x in result if x["snapshot"]]
+        if snapshots:
+            embed.set_footer(text=snapshot_age(min(snapshots)))
+        embed.set_thumbnail(
+            url="https://cdn.iconscout.com/icon/free/png-128/bank-1850789-1571030.png"
+        )
+        await ctx.reply(embed=embed)
+
     @commands.before_invoke(record.record_usage)
     @commands.bot_has_permissions(embed_links=True)
     @commands.command(name="set_balance", aliases=["set_bal", "setbal"])
@@ -100,12 +163,12 @@ class Economy(Cog):
             ctx=ctx,
             title="Setting Player's Balance",
             description=f"{user.mention}'s balance has been set to {amount:,.2f} :coin:"
-            f"from {(bank := Bank(user)):,.2f} :coin:",
+            f"from {(bank := await Bank(user)):,.2f} :coin:",
         )
         embed.set_thumbnail(
             url="https://cdn.iconscout.com/icon/free/png-128/bank-1850789-1571030.png"
         )
-        bank.set(amount)
+        await bank.set(amount)
         await ctx.reply(embed=embed)
 
     @commands.before_invoke(record.record_usage)
@@ -117,7 +180,7 @@ class Economy(Cog):
     ) -> None:
         """Add money to a user's account."""
 
-        bank = Bank(user).add(amount, reason)
+        bank = await Bank(user).add(amount, reason)
         embed = embeds.make_embed(
             ctx=ctx,
             title="Giving Player Money",
@@ -1,6 +1,5 @@
 import logging
 
-import dataset
 import discord
 from discord.ext import commands
 from discord.ext.commands import Cog, Bot, Context, Greedy
@@ -77,16 +76,16 @@ class ModerationCog(Cog):
             )
 
         # Add the ban to the mod_log database.
-        with dataset.connect(database.get_db()) as db:
-            db["mod_logs"].insert(
-                dict(
-                    user_id=member.id,
-                    mod_id=ctx.author.id,
-                    timestamp=ctx.message.created_at,
-                    reason=reason,
-                    type="ban",
-                )
-            )
+        await database.insert(
+            "mod_logs",
+            dict(
+                user_id=member.id,
+                mod_id=ctx.author.id,
+                timestamp=ctx.message.created_at,
+                reason=reason,
+                type="ban",
+            ),
+        )
 
         await ctx.reply(embed=embed)
 
@@ -127,16 +126,16 @@ class ModerationCog(Cog):
             )
 
         # Add the unban to the mod_log database.
-        with dataset.connect(database.get_db()) as db:
-            db["mod_logs"].insert(
-                dict(
-                    user_id=user.id,
-                    mod_id=ctx.author.id,
-                    timestamp=ctx.message.created_at,
-                    reason=reason,
-                    type="unban",
-                )
-            )
+        await database.insert(
+            "mod_logs",
+            dict(
+                user_id=user.id,
+                mod_id=ctx.author.id,
+                timestamp=ctx.message.created_at,
+                reason=reason,
+                type="unban",
+            ),
+        )
 
         await ctx.reply(embed=embed)
 
@@ -177,16 +176,16 @@ class ModerationCog(Cog):
             )
 
         # Add the kick to the mod_log database.
-        with dataset.connect(database.get_db()) as db:
-            db["mod_logs"].insert(
-                dict(
-                    user_id=member.id,
-                    mod_id=ctx.author.id,
-                    timestamp=ctx.message.created_at,
-                    reason=reason,
-                    type="kick",
-                )
-            )
+        await database.insert(
+            "mod_logs",
+            dict(
+                user_id=member.id,
+                mod_id=ctx.author.id,
+                timestamp=ctx.message.created_at,
+                reason=reason,
+                type="kick",
+            ),
+        )
 
         await ctx.reply(embed=embed)
 
@@ -229,16 +228,16 @@ class ModerationCog(Cog):
             )
 
         # Add the mute to the mod_log database.
-        with dataset.connect(database.get_db()) as db:
-            db["mod_logs"].insert(
-                dict(
-                    user_id=member.id,
-                    mod_id=ctx.author.id,
-                    timestamp=ctx.message.created_at,
-                    reason=reason,
-                    type="mute",
-                )
-            )
+        await database.insert(
+            "mod_logs",
+            dict(
+                user_id=member.id,
+                mod_id=ctx.author.id,
+                timestamp=ctx.message.created_at,
+                reason=reason,
+                type="mute",
+            ),
+        )
 
         await ctx.reply(embed=embed)
 
@@ -279,16 +278,16 @@ class ModerationCog(Cog):
             )
 
         # Add the mute to the mod_log database.
-        with dataset.connect(database.get_db()) as db:
-            db["mod_logs"].insert(
-                dict(
-                    user_id=member.id,
-                    mod_id=ctx.author.id,
-                    timestamp=ctx.message.created_at,
-                    reason=reason,
-                    type="unmute",
-                )
-            )
+        await database.insert(
+            "mod_logs",
+            dict(
+                user_id=member.id,
+                mod_id=ctx.author.id,
+                timestamp=ctx.message.created_at,
+                reason=reason,
+                type="unmute",
+            ),
+        )
 
         await ctx.reply(embed=embed)
 
@@ -320,16 +319,16 @@ class ModerationCog(Cog):
             )
 
         # Add the warning to the mod_log database.
-        with dataset.connect(database.get_db()) as db:
-            db["mod_logs"].insert(
-                dict(
-                    user_id=member.id,
-                    mod_id=ctx.author.id,
-                    timestamp=ctx.message.created_at,
-                    reason=reason,
-                    type="warn",
-                )
-            )
+        await database.insert(
+            "mod_logs",
+            dict(
+                user_id=member.id,
+                mod_id=ctx.author.id,
+                timestamp=ctx.message.created_at,
+                reason=reason,
+                type="warn",
+            ),
+        )
 
         # Respond to the context that the member was warned.
         await ctx.reply(embed=embed)
@@ -352,15 +351,15 @@ class ModerationCog(Cog):
         )
 
         # Add the note to the mod_notes database.
-        with dataset.connect(database.get_db()) as db:
-            db["mod_notes"].insert(
-                dict(
-                    user_id=member.id,
-                    mod_id=ctx.author.id,
-                    timestamp=ctx.message.created_at,
-                    note=note,
-                )
-            )
+        await database.insert(
+            "mod_notes",
+            dict(
+                user_id=member.id,
+                mod_id=ctx.author.id,
+                timestamp=ctx.message.created_at,
+                note=note,
+            ),
+        )
 
         # Respond to the context that the message was noted.
         await ctx.reply(embed=embed)
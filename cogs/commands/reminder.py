@@ -1,17 +1,19 @@
 import logging
-import time
+from datetime import datetime, timedelta, timezone
 
 from discord.ext import commands
 from discord.ext.commands import Cog, Bot, Context
-import parsedatetime.parsedatetime as pdt
-import dataset
 
-from tools import database, embeds
+import constants
+from tools import database, dateparse, embeds
 from tools.record import record_usage
 from tools.pagination import LinePaginator
 
 log = logging.getLogger(__name__)
 
+# Shortest interval a recurring reminder may repeat at, see `reminder` in config-default.yml.
+MIN_REPEAT = timedelta(minutes=constants.Reminder.min_repeat_minutes)
+
 
 class Reminder(Cog):
     """Handels reminder commands"""
@@ -29,24 +31,42 @@ class Reminder(Cog):
 
     @remind_group.command(name="make", aliases=["me"])
     async def make(self, ctx: Context, *, time_with_message_in_quotes: str):
-        """!Remind Me TIME_HERE "MESSAGE" (with quotes)"""
+        """!Remind Me TIME_HERE "MESSAGE" (with quotes)
+
+        Start the time with "every" to repeat it, such as !Remind Me every 2 days "MESSAGE"
+        """
 
         message_split = time_with_message_in_quotes.split('"', 1)
         if len(message_split) == 2 and message_split[1].endswith('"'):
             message_split[1] = message_split[1][:-1]
 
         # First we got to figure out what the user's specified date is.
-        cal = pdt.Calendar()
         # Convert text to a date somehow.
-        replyDate = cal.parse(message_split[0], ctx.message.created_at)
+        replyDate = dateparse.parse(message_split[0], ctx.message.created_at)
+
+        # A recurring reminder, first sent one interval from now.
+        repeat_every = None
+        if message_split[0].lower().startswith("every "):
+            replyDate = dateparse.parse(message_split[0][6:], ctx.message.created_at)
+            repeat_every = datetime(*replyDate[0][:6]) - ctx.message.created_at.replace(
+                microsecond=0
+            )
+            if replyDate[1] == 0 or repeat_every < MIN_REPEAT:
+                await embeds.error_message(
+                    f"Recurring reminders need an interval of at least {MIN_REPEAT}, "
+                    'try something like `every 2 days "MESSAGE"`.',
+                    ctx,
+                )
+                return
 
         # date too long or unknown input.
         if replyDate[1] == 0:
             # default time: 1 day.
-            replyDate = cal.parse("1 day", ctx.message.created_at)
-        # Converting time.
+            replyDate = dateparse.parse("1 day", ctx.message.created_at)
+        # Converting time, the message was sent at a UTC time.
+        remind_at = datetime(*replyDate[0][:6], tzinfo=timezone.utc)
         # 9999/12/31 HH/MM/SS.
-        date_to_remind = time.strftime("%Y-%m-%d %H:%M:%S", replyDate[0])
+        date_to_remind = remind_at.strftime("%Y-%m-%d %H:%M:%S")
 
         # Making message to store.
         current_time = ctx.message.created_at.strftime("%Y-%m-%d %H:%M:%S")
@@ -57,16 +77,20 @@ class Reminder(Cog):
             f"{message_split[1]}"
         )
 
-        with dataset.connect(database.get_db()) as tx:
-            tx["remind_me"].insert(
-                dict(
-                    reminder_location=ctx.channel.id,
-                    author_id=ctx.author.id,
-                    date_to_remind=date_to_remind,
-                    message=message,
-                    sent=False,
-                )
-            )
+        reminder_id = await database.insert(
+            "remind_me",
+            dict(
+                reminder_location=ctx.channel.id,
+                author_id=ctx.author.id,
+                date_to_remind=remind_at,
+                message=message,
+                sent=False,
+                repeat_every=repeat_every,
+            ),
+        )
+        # Hand it to the reminder task, so it's sent on time without polling.
+        if task := self.bot.get_cog("ReminderTask"):
+            task.schedule(reminder_id, remind_at)
         embed = embeds.make_embed(
             ctx=ctx,
             title="Reminder Set",
@@ -75,6 +99,8 @@ class Reminder(Cog):
             f"{date_to_remind.replace(' ', '+')}+UTC+To+Local+Time)\n\n"
             f"{message}",
         )
+        if repeat_every:
+            embed.add_field(name="Repeats every", value=str(repeat_every))
         await ctx.reply(embed=embed)
 
     @remind_group.command(name="edit", enabled=False)
@@ -84,21 +110,26 @@ class Reminder(Cog):
     @remind_group.command(name="list")
     async def _list(self, ctx: Context):
         """List your reminders."""
-        with dataset.connect(database.get_db()) as db:
-            # Find all reminders from user and haven't been sent.
-            statement = f"""
-                SELECT id, date_to_remind, message
-                FROM remind_me
-                WHERE author_id = {ctx.author.id} AND sent = FALSE"""
-            result = db.query(statement)
+        # Find all reminders from user and haven't been sent.
+        statement = """
+            SELECT id, date_to_remind, message, repeat_every
+            FROM remind_me
+            WHERE author_id = :author_id AND sent = FALSE
+            ORDER BY date_to_remind"""
+        result = await database.query(statement, author_id=ctx.author.id)
 
         messages = []
         # Convert dict to list.
         for message in result:
+            date_to_remind = message["date_to_remind"].astimezone(timezone.utc)
+            date_to_remind = date_to_remind.strftime("%Y-%m-%d %H:%M:%S")
             alert_time = (
-                f"[**{message['date_to_remind']} UTC**](http://www.wolframalpha.com/input/?i="
-                f"{message['date_to_remind'].replace(' ', '+')}+UTC+To+Local+Time):"
+                f"[**{date_to_remind} UTC**](http://www.wolframalpha.com/input/?i="
+                f"{date_to_remind.replace(' ', '+')}+UTC+To+Local+Time)"
             )
+            if message["repeat_every"]:
+                alert_time += f", repeats every {message['repeat_every']}"
+            alert_time += ":"
             messages.append(
                 f"**ID: {message['id']}** | Alert on {alert_time}\n{message['message']}"
             )
@@ -118,27 +149,26 @@ class Reminder(Cog):
     @remind_group.command(name="delete")
     async def delete(self, ctx: Context, reminder_id: int):
         """Delete Reminders. User `reminder list` to find ID"""
-        with dataset.connect(database.get_db()) as db:
-            # Find all reminders from user and haven't been sent.
-            table = db.load_table("remind_me")
-            result = table.find_one(id=reminder_id)
-            if result is None:
-                await embeds.error_message("Invalid ID", ctx)
-                return
-            if result["author_id"] != ctx.author.id:
-                await embeds.error_message(
-                    "This is not the reminder you are looking for", ctx
-                )
-                return
-            if result["sent"]:
-                await embeds.error_message(
-                    "This reminder has already been deleted", ctx
-                )
-                return
-
-            # All the checks should be done.
-            data = dict(id=reminder_id, sent=True)
-            table.update(data, ["id"])
+        # Find all reminders from user and haven't been sent.
+        result = await database.run(lambda db: db["remind_me"].find_one(id=reminder_id))
+
+        if result is None:
+            await embeds.error_message("Invalid ID", ctx)
+            return
+        if result["author_id"] != ctx.author.id:
+            await embeds.error_message(
+                "This is not the reminder you are looking for", ctx
+            )
+            return
+        if result["sent"]:
+            await embeds.error_message("This reminder has already been deleted", ctx)
+            return
+
+        # All the checks should be done.
+        data = dict(id=reminder_id, sent=True)
+        await database.run(lambda db: db["remind_me"].update(data, ["id"]))
+        if task := self.bot.get_cog("ReminderTask"):
+            task.cancel(reminder_id)
         embed = embeds.make_embed(
             ctx=ctx,
             title="Reminder deleted",
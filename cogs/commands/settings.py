@@ -4,6 +4,9 @@ import re
 
 from discord.ext import commands
 
+from tools import database
+from tools.bank import balance_cache
+from tools.sessions import sessions
 
 log = logging.getLogger(__name__)
 
@@ -37,6 +40,30 @@ class Utilities(commands.Cog):
             command.enabled = True
             await ctx.reply(f"Command {command}, has been enabled")
 
+    @commands.is_owner()
+    @commands.command(name="db_stats", aliases=["dbstats"])
+    async def db_stats(self, ctx: commands.Context):
+        """Show the database connection pool's usage, the balance cache's hit ratio and the open reaction sessions."""
+        status = database.pool_status()
+        cache = balance_cache.status()
+        reactions = sessions.status()
+        await ctx.reply(
+            f"```py\n"
+            f"Pool size:   {status['size']}\n"
+            f"Checked out: {status['checked_out']}\n"
+            f"Checkouts:   {status['checkouts']:,}\n"
+            f"Timeouts:    {status['timeouts']:,}\n"
+            f"Wait avg:    {status['wait_avg'] * 1000:.2f}ms\n"
+            f"Wait max:    {status['wait_max'] * 1000:.2f}ms\n"
+            f"Jobs:        {status['jobs']:,} ({status['in_flight']} in flight)\n"
+            f"Queue avg:   {status['queue_avg'] * 1000:.2f}ms\n"
+            f"Queue max:   {status['queue_max'] * 1000:.2f}ms\n"
+            f"Bank cache:  {cache['size']:,}/{cache['maxsize']:,} balances, "
+            f"{cache['hit_ratio']:.1%} hits ({cache['hits']:,}/{cache['hits'] + cache['misses']:,})\n"
+            f"Sessions:    {reactions['active']} active ({reactions['waiting']} waiting), "
+            f"{reactions['routed']:,} reactions routed, {reactions['timeouts']:,} timeouts```"
+        )
+
     @commands.is_owner()
     @commands.command(name="reload")
     async def reload_cog(self, ctx: commands.Context, name_of_cog: str = None):
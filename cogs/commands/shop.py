@@ -7,7 +7,7 @@ import requests
 
 import constants
 from tools import embeds, record
-from tools.bank import Bank
+from tools.bank import Bank, InsufficientFunds
 
 
 log = logging.getLogger(__name__)
@@ -77,14 +77,18 @@ class Shop(Cog):
             )
             return
 
-        # Check if user can buy emoji
-        if (bal := Bank(ctx.author)) < BUY_EMOJI:
+        # Take payment up front so the same coin can't be spent twice meanwhile.
+        try:
+            await Bank.transfer(
+                ctx.author, None, BUY_EMOJI, f"Buying emoji {emote_name}"
+            )
+        except InsufficientFunds as e:
             await embeds.warning_message(
                 ctx=ctx,
-                description=f"Insufficient funds, you need {BUY_EMOJI} :coin:\nYour balance: {bal:,}",
+                description=f"Insufficient funds, you need {BUY_EMOJI} :coin:\nYour balance: {e.balance:,}",
             )
             log.info(
-                f"Emote.buy: Error {ctx.author.name} didn't meet funds of {DELETE_EMOJI}, while {bal=}"
+                f"Emote.buy: Error {ctx.author.name} didn't meet funds of {DELETE_EMOJI}, while bal={e.balance}"
             )
             return
 
@@ -101,19 +105,16 @@ class Shop(Cog):
             log.info(
                 f"Emote.buy: Error {ctx.author.name} bot doesn't have manage_emojis permission."
             )
+            await Bank(ctx.author).add(BUY_EMOJI, "Refund, emoji was not created")
             return
         except discord.HTTPException as e:
             await embeds.error_message(
                 ctx=ctx, description=f"An error occurred creating an emoji.\n {e.text}"
             )
             log.info(f"Emote.buy: Error {ctx.author.name} HTTPException, {e.text}.")
+            await Bank(ctx.author).add(BUY_EMOJI, "Refund, emoji was not created")
             return
 
-        Bank(ctx.author).subtract(BUY_EMOJI, f"Created emoji {emote}")
-        log.info(
-            f"Emote.buy: {ctx.author.name}'s money was taken out of their account'"
-        )
-
         embed = embeds.make_embed(
             ctx=ctx,
             title=f"Emoji Purchased `:{emote.name}:`",
@@ -138,13 +139,18 @@ class Shop(Cog):
             log.info(f"{ctx.author.name} tried to delete a emote not from the server.")
             return
 
-        if (bal := Bank(ctx.author)) < DELETE_EMOJI:
+        # Take payment up front so the same coin can't be spent twice meanwhile.
+        try:
+            await Bank.transfer(
+                ctx.author, None, DELETE_EMOJI, f"Removing emoji {emote}"
+            )
+        except InsufficientFunds as e:
             await embeds.warning_message(
                 ctx=ctx,
-                description=f"Insufficient funds, you need {DELETE_EMOJI} :coin:\nYour balance: {bal:,}",
+                description=f"Insufficient funds, you need {DELETE_EMOJI} :coin:\nYour balance: {e.balance:,}",
             )
             log.info(
-                f"Emote.delete: Error {ctx.author.name} didn't meet funds of {DELETE_EMOJI}, while {bal=}"
+                f"Emote.delete: Error {ctx.author.name} didn't meet funds of {DELETE_EMOJI}, while bal={e.balance}"
             )
             return
 
@@ -158,19 +164,16 @@ class Shop(Cog):
             log.error(
                 f"Emote.delete: Error {ctx.author.name} bot doesn't have manage_emojis permission."
             )
+            await Bank(ctx.author).add(DELETE_EMOJI, "Refund, emoji was not removed")
             return
         except discord.HTTPException as e:
             await embeds.error_message(
                 ctx=ctx, description=f"An error occurred removing an emoji.\n {e.text}"
             )
             log.error(f"Emote.delete: Error {ctx.author.name} HTTPException, {e.text}.")
+            await Bank(ctx.author).add(DELETE_EMOJI, "Refund, emoji was not removed")
             return
 
-        Bank(ctx.author).subtract(DELETE_EMOJI, f"Removed emoji {emote}")
-        log.info(
-            f"Emote.delete: {ctx.author.name}'s money was taken out of their account'"
-        )
-
         embed = embeds.make_embed(
             ctx=ctx,
             title="Emoji deleted",
@@ -195,13 +198,18 @@ class Shop(Cog):
             log.info(f"{ctx.author.name} tried to rename a emote not from the server.")
             return
 
-        if (bal := Bank(ctx.author)) < RENAME_EMOJI:
+        # Take payment up front so the same coin can't be spent twice meanwhile.
+        try:
+            await Bank.transfer(
+                ctx.author, None, RENAME_EMOJI, f"Renaming emoji {emote}"
+            )
+        except InsufficientFunds as e:
             await embeds.warning_message(
                 ctx=ctx,
-                description=f"Insufficient funds, you need {RENAME_EMOJI} :coin:\nYour balance: {bal:,}",
+                description=f"Insufficient funds, you need {RENAME_EMOJI} :coin:\nYour balance: {e.balance:,}",
             )
             log.info(
-                f"Emote.rename: Error {ctx.author.name} didn't meet funds of {RENAME_EMOJI}, while {bal=}"
+                f"Emote.rename: Error {ctx.author.name} didn't meet funds of {RENAME_EMOJI}, while bal={e.balance}"
             )
             return
 
@@ -218,19 +226,16 @@ class Shop(Cog):
             log.error(
                 f"Emote.rename: Error {ctx.author.name} bot doesn't have manage_emojis permission."
             )
+            await Bank(ctx.author).add(RENAME_EMOJI, "Refund, emoji was not renamed")
             return
         except discord.HTTPException as e:
             await embeds.error_message(
                 ctx=ctx, description=f"An error occurred renameing an emoji.\n {e.text}"
             )
             log.error(f"Emote.rename: Error {ctx.author.name} HTTPException, {e.text}.")
+            await Bank(ctx.author).add(RENAME_EMOJI, "Refund, emoji was not renamed")
             return
 
-        Bank(ctx.author).subtract(RENAME_EMOJI, f"Renamed emoji {emote}")
-        log.info(
-            f"Emote.rename: {ctx.author.name}'s money was taken out of their account'"
-        )
-
         embed = embeds.make_embed(
             ctx=ctx,
             title="Emoji renamed",
@@ -1,16 +1,20 @@
 import asyncio
-import functools
 import logging
 import math
+import time
+from typing import Dict, Iterable
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord.ext.commands import Cog, Bot, Context, BucketType
 import requests
 import dataset
 
-from tools import embeds, database, record
-from tools.bank import Bank
+from tools import embeds, database, positions, record
+from tools.bank import Bank, InsufficientFunds
+from tools.cache import TTLCache, cached
+from tools.finnhub import Finnhub, FinnhubError
+from tools.symbols import SymbolIndex
 import constants
 from tools.pagination import LinePaginator
 
@@ -23,6 +27,21 @@ FINNHUB_TOKEN = constants.Finnhub.token
 
 BROKERAGE_FEE_PERCENTAGE = 0.04
 
+# How long a quote is reused, see `finnhub` in config-default.yml.
+QUOTE_TTL_OPEN = constants.Finnhub.quote_ttl_open
+QUOTE_TTL_CLOSED = constants.Finnhub.quote_ttl_closed
+# A symbol that traded within this many seconds is taken to be in market hours.
+MARKET_OPEN_WINDOW = 15 * 60
+# Bounds for the quote and symbol search caches.
+QUOTE_CACHE_SIZE = constants.Finnhub.quote_cache_size
+SEARCH_CACHE_SIZE = constants.Finnhub.search_cache_size
+SEARCH_CACHE_BYTES = constants.Finnhub.search_cache_mb * 1024 * 1024
+SEARCH_CACHE_TTL = constants.Finnhub.search_cache_ttl
+
+# Where the tradeable symbols are saved and how often they're downloaded again.
+SYMBOL_INDEX_PATH = constants.Finnhub.symbol_index
+SYMBOL_INDEX_MAX_AGE = constants.Finnhub.symbol_index_max_age * 60 * 60
+
 
 class Share:
     """This class is currently not in use. A future update will move towards object-oriented. Here be dragons."""
@@ -62,101 +81,122 @@ class Share:
             log.error(e)
 
 
+class QuoteCache:
+    """Quotes shared by every stock command, so hot tickers are fetched once per TTL.
+
+    Quotes of symbols trading right now are kept for `ttl_open` seconds, the rest,
+    such as stocks outside of market hours, for `ttl_closed`.
+    Concurrent lookups of a symbol that is already being fetched wait for that
+    fetch instead of making their own. Failed lookups are not cached.
+    """
+
+    def __init__(
+        self,
+        finnhub: Finnhub,
+        ttl_open: float = QUOTE_TTL_OPEN,
+        ttl_closed: float = QUOTE_TTL_CLOSED,
+        maxsize: int = QUOTE_CACHE_SIZE,
+    ):
+        self.finnhub = finnhub
+        self.ttl_open = ttl_open
+        self.ttl_closed = ttl_closed
+        self.cache = TTLCache(maxsize=maxsize, ttl=self.ttl)
+
+    def ttl(self, quote: dict) -> float:
+        """Seconds to keep a quote, `t` is the time of its last trade."""
+        if quote.get("t") and time.time() - quote["t"] < MARKET_OPEN_WINDOW:
+            return self.ttl_open
+        return self.ttl_closed
+
+    async def get(self, symbols: Iterable[str]) -> Dict[str, dict]:
+        """Quotes by symbol, symbols that couldn't be fetched are left out."""
+        return await self.cache.fetch_many(symbols, self.finnhub.quotes)
+
+    def status(self) -> dict:
+        return self.cache.status()
+
+
 class Stonks(Cog):
     """Stonks"""
 
     def __init__(self, bot: Bot):
         self.bot = bot
+        self.finnhub = Finnhub()
+        self.quotes = QuoteCache(self.finnhub)
+        self.symbols = SymbolIndex(SYMBOL_INDEX_PATH)
+        self.symbols.load()
+        self._refreshing = asyncio.Lock()
+        self.refresh_symbols_task.start()
+
+    def cog_unload(self) -> None:
+        self.refresh_symbols_task.cancel()
+        asyncio.ensure_future(self.finnhub.close())
+
+    async def stock_price(self, stock: str) -> dict:
+        return (await self.stock_prices([stock]))[stock]
+
+    async def stock_prices(self, stocks: Iterable[str]) -> Dict[str, dict]:
+        """Quotes for many stocks at once, a stock that failed gets an error dict instead."""
+        stocks = list(dict.fromkeys(stocks))
+        quotes = await self.quotes.get(stocks)
+        return {
+            stock: quotes.get(stock, {"error": "Unable to get a price for this stock."})
+            for stock in stocks
+        }
+
+    @cached(
+        maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL, maxbytes=SEARCH_CACHE_BYTES
+    )
+    async def search(self, query: str) -> dict:
+        return await self.finnhub.search(query)
 
-    def stock_price(self, stock: str) -> list:
-        stock = requests.utils.quote(stock)
+    async def stock_query(self, query: str) -> dict:
         try:
-            r = requests.get(
-                f"{FINNHUB_URL}/api/v1/quote?symbol={stock}&token={FINNHUB_TOKEN}"
-            )
-            return r.json()
-        except Exception as e:
+            return await self.search(query)
+        except FinnhubError as e:
             log.error(e)
+            return {"error": str(e), "result": []}
+
+    async def refresh_symbols(self) -> None:
+        """Rebuild the tradeable symbol index if it's missing or out of date."""
+        async with self._refreshing:
+            if self.symbols.is_stale(SYMBOL_INDEX_MAX_AGE):
+                await self.symbols.refresh(self.finnhub)
+
+    @tasks.loop(hours=1)
+    async def refresh_symbols_task(self) -> None:
+        """Keeping the tradeable symbol index up to date"""
+        # Wait for bot to start.
+        await self.bot.wait_until_ready()
 
-    @functools.lru_cache(maxsize=None)
-    def stock_query(self, query: str) -> list:
-        query = requests.utils.quote(query)
         try:
-            r = requests.get(
-                f"{FINNHUB_URL}/api/v1/search?q={query}&token={FINNHUB_TOKEN}"
-            )
-            return r.json()
+            await self.refresh_symbols()
+        # Catch all exceptions to keep the task alive, the old index stays in use.
         except Exception as e:
-            log.error(e)
+            log.error("Refreshing the symbol index failed", exc_info=e)
 
-    @functools.lru_cache(maxsize=None)
-    def get_symbols(self, mic: str) -> list:
-        # download a all the symbols from a particular exchange identified by it's mic
-        # https://en.wikipedia.org/wiki/Market_Identifier_Code
-        r = requests.get(
-            f"https://finnhub.io/api/v1/stock/symbol?exchange=US&mic={mic}&token={FINNHUB_TOKEN}"
-        )
+    async def can_trade(self, symbol: str) -> bool:
+        """Whether a symbol can be traded.
 
-        # we only want the actual symbol and nothing else from the data
-        return [x["symbol"] for x in r.json()]
-
-    @functools.lru_cache(maxsize=None)
-    def get_crypto_symbols(self, exchange: str) -> list:
-        # Download a all the symbols from a particular crypto exchange.
-        r = requests.get(
-            f"https://finnhub.io/api/v1/crypto/symbol?exchange={exchange}&token={FINNHUB_TOKEN}"
+        Symbols listed on one of the exchanges we trade from are found in the index.
+        Anything else search finds is allowed as well, except common stocks, which
+        have to be listed on our exchanges.
+        """
+        if not len(self.symbols):
+            # Nothing saved and the first refresh hasn't finished yet.
+            try:
+                await self.refresh_symbols()
+            except FinnhubError as e:
+                log.error(e)
+        if symbol in self.symbols:
+            return True
+
+        result = (await self.stock_query(symbol))["result"]
+        return any(
+            stock["symbol"] == symbol and stock["type"] != "Common Stock"
+            for stock in result
         )
 
-        # we only want the actual symbol and nothing else from the data
-        return [x["symbol"] for x in r.json()]
-
-    def can_trade(self, symbol: str) -> bool:
-        # We want to know if this is a stock or something else like crypto.
-        stock_type = self.stock_query(symbol)["result"]
-        stock = list(filter(lambda x: x["symbol"] == symbol, stock_type))
-
-        if not stock:
-            all_symbols = []
-            for exchange in [
-                "KRAKEN",
-                "ZB",
-                "BITMEX",
-                "KUCOIN",
-                "POLONIEX",
-                "HITBTC",
-                "OKEX",
-                "BITFINEX",
-                "GEMINI",
-                "BITTREX",
-                "BINANCE",
-                "COINBASE",
-                "HUOBI",
-                "FXPIG",
-            ]:
-                all_symbols.append(
-                    [
-                        item.partition(":")[2]
-                        for item in self.get_crypto_symbols(exchange.lower())
-                    ]
-                )
-
-            # Check to see if our crypto is in the list of symbols we pulled from the exchanges.
-            return symbol in all_symbols
-
-        if stock[0]["type"] == "Common Stock":
-            symbol_set_1 = self.get_symbols("XNYS")  # NYSE
-            symbol_set_2 = self.get_symbols("XNAS")  # All NASDAQ Exchanges
-            symbol_set_3 = self.get_symbols("XASE")  # AMEX
-            symbol_set_4 = self.get_symbols("ARCX")  # NYSE Arca
-
-            all_symbols = symbol_set_1 + symbol_set_2 + symbol_set_3 + symbol_set_4
-
-            # Check to see if our symbol is in the list of symbols we pulled from the exchanges.
-            return symbol in all_symbols
-
-        # Return true if not a stock
-        return True
-
     @commands.before_invoke(record.record_usage)
     @commands.cooldown(rate=20, per=60, type=BucketType.default)
     @commands.cooldown(rate=8, per=600, type=BucketType.user)
@@ -171,12 +211,10 @@ class Stonks(Cog):
             await ctx.send_help(ctx.command)
             return
 
-        stonk_dict = {}
         message = []
 
         async with ctx.channel.typing():
-            for stonk in stonks[:5]:
-                stonk_dict[stonk.upper()] = self.stock_price(stonk.upper())
+            stonk_dict = await self.stock_prices(stonk.upper() for stonk in stonks[:5])
 
         embed = embeds.make_embed(
             ctx=ctx,
@@ -189,7 +227,7 @@ class Stonks(Cog):
             if "error" in ticker:
                 embed.add_field(name=stonk, value=ticker["error"], inline=False)
                 continue
-            if not self.can_trade(stonk.upper()):
+            if not await self.can_trade(stonk.upper()):
                 stonk += " - Not Tradeable"
             if ticker["t"] != 0:
                 message = (
@@ -218,13 +256,13 @@ class Stonks(Cog):
     async def buy_stock(self, ctx: Context, stonk: str, number_of_stonks: int):
         """Invest in the stock market"""
 
-        if not self.can_trade(stonk.upper()):
+        if not await self.can_trade(stonk.upper()):
             await embeds.warning_message(
                 ctx, "This stock is not listed on a tradeable exchange."
             )
             return
 
-        stonk = (stonk.upper(), self.stock_price(stonk.upper()))
+        stonk = (stonk.upper(), await self.stock_price(stonk.upper()))
 
         if "error" in stonk[1]:
             embeds.error_embed(
@@ -245,40 +283,38 @@ class Stonks(Cog):
 
         purchase_price = round(number_of_stonks * stonk[1]["c"] * 100, 6)
 
-        if purchase_price > (bal := float(Bank(ctx.author))):
+        def record_purchase(db: dataset.Database) -> None:
+            positions.record_buy(
+                db,
+                ctx.author.id,
+                stonk[0],
+                number_of_stonks,
+                purchase_price,
+                ctx.message.created_at,
+            )
+
+        try:
+            await Bank.transfer(
+                ctx.author,
+                None,
+                purchase_price,
+                f"Buying **{number_of_stonks:,}** shares of **{stonk[0]}**",
+                extra=record_purchase,
+            )
+        except InsufficientFunds as e:
             await embeds.error_message(
                 ctx=ctx,
                 description="You do not have enough coin.\n"
                 f"Amount needed: **`{round(purchase_price,2):,.2f}`** :coin:\n"
-                f"Current balance: **`{bal:,}`**` :coin:",
+                f"Current balance: **`{e.balance:,}`**` :coin:",
             )
             return
-
-        with dataset.connect(
-            database.get_db(), engine_kwargs={"pool_recycle": 300}
-        ) as db:
-            try:
-                Bank(ctx.author).subtract(
-                    purchase_price,
-                    f"Buying **{number_of_stonks:,}** shares of **{stonk[0]}**",
-                )
-
-                db["stonks"].insert(
-                    dict(
-                        author_id=ctx.author.id,
-                        stonk=stonk[0],
-                        amount=number_of_stonks,
-                        investment_cost=(-1 * purchase_price),
-                        timestamp=ctx.message.created_at,
-                    )
-                )
-            except Exception as e:
-                await embeds.error_message(
-                    "An error occurred: notify <@396570271265325058>", ctx
-                )
-                log.error("something happend", exc_info=e)
-                db.rollback()
-                return
+        except Exception as e:
+            await embeds.error_message(
+                "An error occurred: notify <@396570271265325058>", ctx
+            )
+            log.error("something happend", exc_info=e)
+            return
 
         embed = embeds.make_embed(
             ctx=ctx,
@@ -308,7 +344,13 @@ class Stonks(Cog):
                 and m.author == ctx.author
             )
 
-        stonk = (stonk.upper(), self.stock_price(stonk.upper()))
+        if number_of_stonks < 1:
+            await embeds.warning_message(
+                ctx, "You can only sell a positive number of shares."
+            )
+            return
+
+        stonk = (stonk.upper(), await self.stock_price(stonk.upper()))
 
         if "error" in stonk[1]:
             embeds.error_embed(
@@ -322,72 +364,68 @@ class Stonks(Cog):
 
         sell_price = round(number_of_stonks * stonk[1]["c"] * 100, 6)
 
-        with dataset.connect(
-            database.get_db(), engine_kwargs={"pool_recycle": 300}
-        ) as db:
-            try:
-                statement = f"""
-                    SELECT stonk, Sum(amount) totalstonks
-                    FROM stonks
-                    WHERE author_id = {ctx.author.id} AND stonk = '{stonk[0]}'
-                    GROUP BY stonk"""
-                result = db.query(statement)
-
-                for x in result:
-                    result = x
-                if result["totalstonks"] is None:
-                    await embeds.warning_message(
-                        ctx, f"You do not own any **`{stonk[0]}`** stock"
-                    )
-                    return
+        totalstonks = await positions.owned(ctx.author.id, stonk[0])
+        if not totalstonks:
+            await embeds.warning_message(
+                ctx, f"You do not own any **`{stonk[0]}`** stock"
+            )
+            return
 
-                if result["totalstonks"] < number_of_stonks:
-                    await embeds.warning_message(
-                        ctx,
-                        f"You do not own enough **`{stonk[0]}`** stock.\n{result['totalstonks']:,} shares owned",
-                    )
-                    return
-
-                fee = math.ceil((sell_price) * BROKERAGE_FEE_PERCENTAGE)
-
-                rep = await ctx.reply(
-                    embed=embeds.make_embed(
-                        ctx=ctx,
-                        title="Confirm sell",
-                        description=f"Type **`Confirm`** to sell your **`{number_of_stonks}`** "
-                        f"shares for **`{sell_price:,.2f}`** :coin:.\n"
-                        f"The Brokerage fee is: **`{fee:,.0f}`** :coin:",
-                    ),
-                    delete_after=45,
-                )
+        if totalstonks < number_of_stonks:
+            await embeds.warning_message(
+                ctx,
+                f"You do not own enough **`{stonk[0]}`** stock.\n{totalstonks:,} shares owned",
+            )
+            return
 
-                try:
-                    msg = await self.bot.wait_for("message", timeout=30.0, check=check)
-                except asyncio.TimeoutError:
-                    await rep.reply("Sell timed out, canceled", delete_after=15)
-                    return
+        fee = math.ceil((sell_price) * BROKERAGE_FEE_PERCENTAGE)
 
-                Bank(ctx.author).add(
-                    sell_price - fee,
-                    f"Selling **{number_of_stonks:,}** shares of **{stonk[0]}**",
-                )
+        rep = await ctx.reply(
+            embed=embeds.make_embed(
+                ctx=ctx,
+                title="Confirm sell",
+                description=f"Type **`Confirm`** to sell your **`{number_of_stonks}`** "
+                f"shares for **`{sell_price:,.2f}`** :coin:.\n"
+                f"The Brokerage fee is: **`{fee:,.0f}`** :coin:",
+            ),
+            delete_after=45,
+        )
 
-                db["stonks"].insert(
-                    dict(
-                        author_id=ctx.author.id,
-                        stonk=stonk[0],
-                        amount=(-1 * number_of_stonks),
-                        investment_cost=(sell_price),
-                        timestamp=ctx.message.created_at,
-                    )
-                )
-            except Exception as e:
-                await embeds.error_message(
-                    "An error occurred: notify <@396570271265325058>", ctx
-                )
-                log.error("something happend", exc_info=e)
-                db.rollback()
-                return
+        try:
+            msg = await self.bot.wait_for("message", timeout=30.0, check=check)
+        except asyncio.TimeoutError:
+            await rep.reply("Sell timed out, canceled", delete_after=15)
+            return
+
+        def record_sale(db: dataset.Database) -> None:
+            positions.record_sell(
+                db,
+                ctx.author.id,
+                stonk[0],
+                number_of_stonks,
+                sell_price,
+                ctx.message.created_at,
+            )
+
+        try:
+            await Bank(ctx.author).add(
+                sell_price - fee,
+                f"Selling **{number_of_stonks:,}** shares of **{stonk[0]}**",
+                extra=record_sale,
+            )
+        except positions.InsufficientShares as e:
+            # Shares were sold elsewhere while waiting for the confirmation.
+            await embeds.warning_message(
+                ctx,
+                f"You do not own enough **`{stonk[0]}`** stock.\n{e.owned:,} shares owned",
+            )
+            return
+        except Exception as e:
+            await embeds.error_message(
+                "An error occurred: notify <@396570271265325058>", ctx
+            )
+            log.error("something happend", exc_info=e)
+            return
 
         embed = embeds.make_embed(
             ctx=ctx,
@@ -420,36 +458,22 @@ class Stonks(Cog):
         if user != ctx.author:
             embed.title = f"{user.name}'s Portfolio"
 
-        with dataset.connect(
-            database.get_db(), engine_kwargs={"pool_recycle": 300}
-        ) as db:
-            # Find all stock from user and combine like stock purchases.
-            statement = statement = f"""
-                SELECT stonk, Sum(amount) totalstonks
-                FROM stonks
-                WHERE author_id = {user.id}
-                GROUP BY stonk"""
-            result = db.query(statement)
+        holdings = await positions.holdings(user.id)
 
         port = []
         investment = 0
         async with ctx.channel.typing():
-            for count, x in enumerate(result):
-                # have to sleep due to rate limits on API
-                if 1 + count % 10 == 0:
-                    asyncio.sleep(10)
+            quotes = await self.stock_prices(x["stonk"] for x in holdings)
+            for x in holdings:
                 stonk = x["stonk"]
-                stonk_amount = x["totalstonks"]
-                # don't need to lookup any stocks that user doesn't have any of.
-                if stonk_amount <= 0:
-                    continue
-                result = self.stock_price(x["stonk"])
-                if "error" in result:
-                    embeds.error_embed(
-                        ctx, "An error occurred, please try again:\n" + result["error"]
+                stonk_amount = x["quantity"]
+                if "error" in quotes[stonk]:
+                    port.append(
+                        f"[{stonk}](https://finance.yahoo.com/quote/{stonk})\n"
+                        f" Shares:**` {stonk_amount:>7,} `** Value:**` unavailable`**"
                     )
-                    return
-                price = round(stonk_amount * result["c"] * 100, 6)
+                    continue
+                price = round(stonk_amount * quotes[stonk]["c"] * 100, 6)
                 investment += price
                 port.append(
                     f"[{stonk}](https://finance.yahoo.com/quote/{stonk})\n"
@@ -483,17 +507,14 @@ class Stonks(Cog):
             "?width=1200&rect=680x453&offset=0x30",
         )
 
-        with dataset.connect(
-            database.get_db(), engine_kwargs={"pool_recycle": 300}
-        ) as db:
-            # Find all stock from user and combine like stock purchases.
-            statement = statement = f"""
-                SELECT stonk, amount, investment_cost
-                FROM stonks
-                WHERE author_id = {user.id}
-                ORDER BY id DESC
-                LIMIT 100"""
-            result = db.query(statement)
+        # Find all stock from user and combine like stock purchases.
+        statement = statement = f"""
+            SELECT stonk, amount, investment_cost
+            FROM stonks
+            WHERE author_id = {user.id}
+            ORDER BY id DESC
+            LIMIT 100"""
+        result = await database.query(statement)
 
         port = []
         async with ctx.channel.typing():
@@ -534,7 +555,7 @@ class Stonks(Cog):
 
         port = []
         async with ctx.channel.typing():
-            result = self.stock_query(query)
+            result = await self.stock_query(query)
             for x in result["result"]:
                 description = x["description"]
                 displaySymbol = x["displaySymbol"]
@@ -564,35 +585,22 @@ class Stonks(Cog):
             "?width=1200&rect=680x453&offset=0x30",
         )
 
-        with dataset.connect(
-            database.get_db(), engine_kwargs={"pool_recycle": 300}
-        ) as db:
-            # Find all stock from user and combine like stock purchases.
-            statement = """
-                SELECT stonk, Sum(amount) totalstonks
-                FROM stonks
-                GROUP BY stonk"""
-            result = db.query(statement)
+        holdings = await positions.market()
 
         port = []
         investment = 0
         async with ctx.channel.typing():
-            for count, x in enumerate(result):
-                # have to sleep due to rate limits on API
-                await asyncio.sleep(1)
+            quotes = await self.stock_prices(x["stonk"] for x in holdings)
+            for x in holdings:
                 stonk = x["stonk"]
-                stonk_amount = x["totalstonks"]
-                # don't need to lookup any stocks that user doesn't have any of.
-                if stonk_amount <= 0:
+                stonk_amount = x["quantity"]
+                if "error" in quotes[stonk]:
+                    port.append(
+                        f"[{stonk}](https://finance.yahoo.com/quote/{stonk})"
+                        f" Shares:**` {stonk_amount:>7,} `** Value:**` unavailable`**"
+                    )
                     continue
-                while True:
-                    try:
-                        value = self.stock_price(x["stonk"])["c"]
-                        break
-                    except:
-                        await asyncio.sleep(1)
-                        continue
-                price = round(value * 100, 6)
+                price = round(quotes[stonk]["c"] * 100, 6)
                 investment += price * stonk_amount
                 port.append(
                     f"[{stonk}](https://finance.yahoo.com/quote/{stonk})"
@@ -618,16 +626,13 @@ class Stonks(Cog):
             "?width=1200&rect=680x453&offset=0x30",
         )
 
-        with dataset.connect(
-            database.get_db(), engine_kwargs={"pool_recycle": 300}
-        ) as db:
-            # Find all stock from user and combine like stock purchases.
-            statement = statement = """
-                SELECT author_id, stonk, amount, investment_cost
-                FROM stonks
-                ORDER BY "timestamp" DESC
-                LIMIT 250"""
-            result = db.query(statement)
+        # Find all stock from user and combine like stock purchases.
+        statement = statement = """
+            SELECT author_id, stonk, amount, investment_cost
+            FROM stonks
+            ORDER BY "timestamp" DESC
+            LIMIT 250"""
+        result = await database.query(statement)
 
         port = []
         async with ctx.channel.typing():
@@ -647,6 +652,25 @@ class Stonks(Cog):
             port, ctx, embed, max_size=2000, restrict_to_user=ctx.author, linesep=""
         )
 
+    @commands.is_owner()
+    @commands.command(name="cache_stats", aliases=["cachestats", "quote_stats"])
+    async def cache_stats(self, ctx: Context):
+        """Show how often stock quotes and searches are served from their caches."""
+        lines = []
+        for name, status in (
+            ("Quotes", self.quotes.status()),
+            ("Searches", self.search.cache.status()),
+        ):
+            lines.append(
+                f"{name + ':':<9} {status['size']:,}/{status['maxsize']:,} entries, "
+                f"{status['bytes'] / 1024:,.0f} KiB, "
+                f"{status['hit_ratio']:.1%} hits "
+                f"({status['hits']:,} hit, {status['coalesced']:,} coalesced, {status['misses']:,} missed), "
+                f"{status['evictions']:,} evicted, {status['expirations']:,} expired"
+            )
+        lines = "\n".join(lines)
+        await ctx.reply(f"```py\n{lines}```")
+
 
 def setup(bot: Bot) -> None:
     """Load the Stonks cog."""
@@ -0,0 +1,53 @@
+import logging
+
+import discord
+from discord.ext import commands
+
+from tools.sessions import sessions
+
+log = logging.getLogger(__name__)
+
+
+class ReactionSessions(commands.Cog):
+    """Routes reactions to the games and paginators waiting on them, see `tools.sessions`."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(
+        self, payload: discord.RawReactionActionEvent
+    ) -> None:
+        """Event Listener which is called when a message has a reaction added to it.
+
+        Args:
+            payload (RawReactionActionEvent): The reaction, its message and who added it.
+
+        Note:
+            This requires Intents.reactions to be enabled.
+
+        For more information:
+            https://discordpy.readthedocs.io/en/stable/api.html#discord.on_raw_reaction_add
+        """
+        # The bot's own reactions are the buttons being set up.
+        if (
+            payload.user_id == self.bot.user.id
+            or payload.message_id not in sessions.sessions
+        ):
+            return
+
+        # Guild reactions come with the member, direct messages only with the user id.
+        user = payload.member or self.bot.get_user(payload.user_id)
+        if user is None:
+            try:
+                user = await self.bot.fetch_user(payload.user_id)
+            except discord.HTTPException as e:
+                log.warning(f"Unable to find user {payload.user_id} who reacted: {e}")
+                return
+        sessions.dispatch(payload, user)
+
+
+def setup(bot: commands.Bot) -> None:
+    """Load the reaction_sessions cog."""
+    bot.add_cog(ReactionSessions(bot))
+    log.info("Cog loaded: reaction_sessions")
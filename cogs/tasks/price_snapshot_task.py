@@ -0,0 +1,65 @@
+import logging
+from datetime import datetime
+
+from discord.ext import tasks
+from discord.ext.commands import Bot, Cog
+
+import constants
+from tools import database, positions
+
+log = logging.getLogger(__name__)
+
+# Minutes between snapshots, see `finnhub` in config-default.yml.
+SNAPSHOT_INTERVAL = constants.Finnhub.price_snapshot_interval
+# Symbols quoted and saved together, one burst of the rate limit.
+BATCH_SIZE = constants.Finnhub.burst
+
+
+class PriceSnapshotTask(Cog):
+    """Price Snapshot Background Task"""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self.snapshot_prices.start()
+
+    def cog_unload(self):
+        self.snapshot_prices.cancel()
+
+    @tasks.loop(minutes=SNAPSHOT_INTERVAL)
+    async def snapshot_prices(self) -> None:
+        """Saving the price of every held stock for net worth rankings"""
+        # Wait for bot to start.
+        await self.bot.wait_until_ready()
+
+        # Quotes go through the stock commands' client and cache, sharing their rate limit.
+        stonks = self.bot.get_cog("Stonks")
+        if stonks is None:
+            log.warning("Stonks cog isn't loaded, skipping price snapshot.")
+            return
+
+        try:
+            symbols = [x["stonk"] for x in await positions.market()]
+            saved = 0
+            for i in range(0, len(symbols), BATCH_SIZE):
+                quotes = await stonks.stock_prices(symbols[i : i + BATCH_SIZE])
+                # Keep the last price of stocks that failed or are unknown to Finnhub.
+                prices = {
+                    symbol: round(quote["c"] * 100, 6)
+                    for symbol, quote in quotes.items()
+                    if "error" not in quote and quote.get("t")
+                }
+                if prices:
+                    await database.run(positions.record_prices, prices, datetime.now())
+                    saved += len(prices)
+            await database.run(positions.prune_prices)
+            log.info(f"Price snapshot saved {saved:,} of {len(symbols):,} held stocks.")
+
+        # Catch all exceptions to keep the task alive and log the traceback for future debugging.
+        except Exception as e:
+            log.error("price snapshot task broke", exc_info=e)
+
+
+def setup(bot: Bot) -> None:
+    """Load the PriceSnapshotTask cog."""
+    bot.add_cog(PriceSnapshotTask(bot))
+    log.info("Cog loaded: price_snapshot_task")
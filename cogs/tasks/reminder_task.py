@@ -1,70 +1,336 @@
+import asyncio
+import heapq
 import logging
-import traceback
-from datetime import datetime
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
 
-import dataset
+import discord
 from discord.ext import tasks
 from discord.ext.commands import Bot, Cog
 
+import constants
 from tools import database, embeds
 
 log = logging.getLogger(__name__)
 
+# Minutes between loading the reminders coming due, see `reminder` in config-default.yml.
+RESYNC_INTERVAL = constants.Reminder.resync_interval
+# Reminders due further out than this are left in the database until a later resync.
+# Twice the interval, so a resync that runs late doesn't miss any.
+HORIZON = timedelta(minutes=2 * RESYNC_INTERVAL)
+
+# Characters allowed in an embed's description.
+EMBED_LIMIT = 2048
+# Most reminders merged into one message.
+BATCH_SIZE = 10
+# Channels posted to at once.
+SEND_CONCURRENCY = 5
+
+# Reacting with this to a posted reminder sends it again `SNOOZE` later.
+SNOOZE_EMOJI = "\N{ALARM CLOCK}"
+SNOOZE = timedelta(minutes=constants.Reminder.snooze_minutes)
+# How long a posted reminder can be snoozed for, and how many are remembered at once.
+SNOOZE_WINDOW = timedelta(hours=1)
+SNOOZABLE_SIZE = 1000
+
+
+def utcnow() -> datetime:
+    """The current time in UTC, timezone aware to compare with `remind_me.date_to_remind`."""
+    return datetime.now(timezone.utc)
+
 
 class ReminderTask(Cog):
-    """Reminder Background Task"""
+    """Reminder Background Task
+
+    Reminders due within the horizon wait in a heap ordered by due time, so each one
+    is sent the moment it's due with no queries while idle. `schedule()` and `cancel()`
+    are called by the reminder commands as reminders are made and deleted.
+    """
 
     def __init__(self, bot: Bot):
         self.bot = bot
-        # Task disabled to midigate database client leak bug.
-        # self.check_for_reminder.start()
+        # Due time and id of every scheduled reminder, soonest first.
+        self.heap: List[Tuple[datetime, int]] = []
+        # Due time of each scheduled reminder by id, heap entries not in here were cancelled.
+        self.scheduled: Dict[int, datetime] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        # Posted message id to when it was posted and the reminder and author ids in it.
+        self.snoozable: "OrderedDict[int, Tuple[datetime, List[Tuple[int, int]]]]" = (
+            OrderedDict()
+        )
+        self.resync.start()
+        self.deliver.start()
 
     def cog_unload(self):
-        self.check_for_reminder.cancel()
+        self.resync.cancel()
+        self.deliver.cancel()
+
+    @property
+    def wakeup(self) -> asyncio.Event:
+        # Created on first use, so it belongs to the running event loop.
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+    def schedule(self, reminder_id: int, due: datetime) -> None:
+        """Send a reminder at `due`, timezone aware. Ones past the horizon are left to `resync`."""
+        if due > utcnow() + HORIZON or self.scheduled.get(reminder_id) == due:
+            return
+        self.scheduled[reminder_id] = due
+        heapq.heappush(self.heap, (due, reminder_id))
+        # Let `deliver` sleep until this reminder if it's now the soonest.
+        self.wakeup.set()
+
+    def cancel(self, reminder_id: int) -> None:
+        """Stop a scheduled reminder from being sent, its heap entry is skipped when it comes up."""
+        self.scheduled.pop(reminder_id, None)
+
+    @tasks.loop(minutes=RESYNC_INTERVAL)
+    async def resync(self) -> None:
+        """Loading the reminders coming due into the schedule"""
+        try:
+            horizon = utcnow() + HORIZON
+            # Find all reminders due before the horizon that have not been sent.
+            statement = """
+                SELECT id, date_to_remind
+                FROM remind_me
+                WHERE date_to_remind < :horizon AND sent = FALSE
+            """
+            result = await database.query(statement, horizon=horizon)
+            for reminder in result:
+                self.schedule(reminder["id"], reminder["date_to_remind"])
+
+        # Catch all exceptions to keep the task alive and log the traceback for future debugging.
+        except Exception as e:
+            log.error("reminder resync broke", exc_info=e)
+
+    async def sleep_until_due(self) -> None:
+        """Wait for the soonest reminder to come due, or for a sooner one to be scheduled."""
+        self.wakeup.clear()
+        timeout = None
+        if self.heap:
+            timeout = (self.heap[0][0] - utcnow()).total_seconds()
+            if timeout <= 0:
+                return
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def pop_due(self) -> List[int]:
+        """Take every reminder that's due off the schedule, returning their ids."""
+        now = utcnow()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            date, reminder_id = heapq.heappop(self.heap)
+            # Skip cancelled reminders and ones since moved to another time.
+            if self.scheduled.get(reminder_id) == date:
+                del self.scheduled[reminder_id]
+                due.append(reminder_id)
+        return due
 
-    # Loop 3 seconds to avoid ravaging the CPU.
-    @tasks.loop(seconds=5.0)
-    async def check_for_reminder(self) -> None:
-        """Checking for reminders to send"""
+    @tasks.loop()
+    async def deliver(self) -> None:
+        """Sending reminders as they come due"""
         # Wait for bot to start.
         await self.bot.wait_until_ready()
+        await self.sleep_until_due()
+
+        due = self.pop_due()
+        # Every reminder taken is due by now, ones moved later while posting were snoozed.
+        popped = utcnow()
+        if not due:
+            return
 
         try:
-            # Get current time to compare.
-            current_time = datetime.utcnow()
-            current_time = format(current_time, "%Y-%m-%d %H:%M:%S")
-            with dataset.connect(
-                database.get_db(), engine_kwargs={"pool_recycle": 300}
-            ) as db:
-                # Find all reminders that are older than current time and have not been sent.
-                statement = f"""
-                    SELECT id, reminder_location, author_id, message
-                    FROM remind_me
-                    WHERE date_to_remind < '{current_time}' AND sent = FALSE
-                """
-                result = db.query(statement)
-            for reminder in result:
-                # Find the channel.
-                channel = self.bot.get_channel(reminder["reminder_location"])
-                # Find the User.
-                user = self.bot.get_user(reminder["author_id"])
+            # Deleted reminders are flagged as sent, so they're filtered out here.
+            statement = """
+                SELECT id, reminder_location, author_id, message
+                FROM remind_me
+                WHERE id = ANY(:ids) AND sent = FALSE
+                ORDER BY date_to_remind, id
+            """
+            result = await database.query(statement, ids=due)
 
-                embed = embeds.make_embed(
-                    title="Here is your reminder", description=reminder["message"]
+            # Group reminders by channel, so each channel gets as few messages as possible.
+            channels = defaultdict(list)
+            for reminder in result:
+                channels[reminder["reminder_location"]].append(reminder)
+            # Limits how many channels are posted to at once, discord.py waits out rate limits.
+            slots = asyncio.Semaphore(SEND_CONCURRENCY)
+            handled = await asyncio.gather(
+                *(
+                    self.send_reminders(channel_id, reminders, slots)
+                    for channel_id, reminders in channels.items()
                 )
-                try:
-                    await channel.send(user.mention, embed=embed)
-                    # Update database to flag that message was sent.
-                    table = db["remind_me"]
-                    data = dict(id=reminder["id"], sent=True)
-                    table.update(data, ["id"])
-                except:
-                    log.warn(f"Unable to post reminder for {reminder['id']=}")
+            )
+
+            # Update database to flag every posted reminder as sent at once,
+            # recurring ones move on to their first occurrence after now instead.
+            # Reminders snoozed before this runs are due again later and left alone.
+            ids = [reminder_id for ids in handled for reminder_id in ids]
+            if ids:
+                statement = """
+                    UPDATE remind_me
+                    SET sent = repeat_every IS NULL,
+                        date_to_remind = CASE
+                            WHEN repeat_every IS NULL THEN date_to_remind
+                            ELSE date_to_remind + repeat_every * (FLOOR(
+                                EXTRACT(EPOCH FROM NOW() - date_to_remind)
+                                / EXTRACT(EPOCH FROM repeat_every)
+                            ) + 1)
+                        END
+                    WHERE id = ANY(:ids) AND date_to_remind <= :popped
+                    RETURNING id, date_to_remind, sent
+                """
+                result = await database.query(statement, ids=ids, popped=popped)
+                for reminder in result:
+                    if not reminder["sent"]:
+                        self.schedule(reminder["id"], reminder["date_to_remind"])
 
         # Catch all exceptions to avoid crashing and log the traceback for future debugging.
         except Exception as e:
             log.error("remind me task broke", exc_info=e)
-            traceback.print_exc()
+
+    async def send_reminders(
+        self, channel_id: int, reminders: List[dict], slots: asyncio.Semaphore
+    ) -> List[int]:
+        """Post a channel's reminders, several to a message, returns the ids of the ones handled.
+
+        Reminders that failed to post are left unsent for the next resync to retry.
+        """
+        # Find the channel.
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            # The channel is gone, retrying would never succeed.
+            log.warning(
+                f"Dropping {len(reminders)} reminder(s) for missing channel {channel_id}."
+            )
+            return [reminder["id"] for reminder in reminders]
+
+        handled = []
+        async with slots:
+            for batch in batch_reminders(reminders):
+                # Mention each user once, the embed says which reminder is whose.
+                mentions = " ".join(
+                    dict.fromkeys(f"<@{reminder['author_id']}>" for reminder in batch)
+                )
+                if len(batch) == 1:
+                    embed = embeds.make_embed(
+                        title="Here is your reminder",
+                        description=batch[0]["message"][:EMBED_LIMIT],
+                    )
+                else:
+                    embed = embeds.make_embed(
+                        title="Here are your reminders",
+                        description="\n\n".join(reminder_text(x) for x in batch),
+                    )
+                try:
+                    message = await channel.send(mentions, embed=embed)
+                except discord.HTTPException as e:
+                    ids = [reminder["id"] for reminder in batch]
+                    log.warning(f"Unable to post reminders {ids} in {channel_id}: {e}")
+                    # Later batches would most likely fail the same way.
+                    break
+                handled.extend(reminder["id"] for reminder in batch)
+                await self.offer_snooze(message, batch)
+        return handled
+
+    async def offer_snooze(self, message: discord.Message, batch: List[dict]) -> None:
+        """Let the users in a posted message snooze their reminders by reacting to it."""
+        self.snoozable[message.id] = (
+            utcnow(),
+            [(reminder["id"], reminder["author_id"]) for reminder in batch],
+        )
+        while len(self.snoozable) > SNOOZABLE_SIZE:
+            self.snoozable.popitem(last=False)
+        try:
+            await message.add_reaction(SNOOZE_EMOJI)
+        except discord.HTTPException as e:
+            log.warning(f"Unable to offer snooze on {message.id}: {e}")
+
+    @Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        """Snoozing the reacting user's reminders in a posted reminder message"""
+        if (
+            str(payload.emoji) != SNOOZE_EMOJI
+            or payload.message_id not in self.snoozable
+            or payload.user_id == self.bot.user.id
+        ):
+            return
+
+        posted, reminders = self.snoozable[payload.message_id]
+        if utcnow() - posted > SNOOZE_WINDOW:
+            del self.snoozable[payload.message_id]
+            return
+        # Each reminder can be snoozed once per message.
+        ids = [x for x, author_id in reminders if author_id == payload.user_id]
+        if not ids:
+            return
+        self.snoozable[payload.message_id] = (
+            posted,
+            [x for x in reminders if x[1] != payload.user_id],
+        )
+
+        until = utcnow() + SNOOZE
+        try:
+            # One-off reminders are sent again, recurring ones get a one-off copy
+            # so their schedule carries on.
+            statement = """
+                WITH resent AS (
+                    UPDATE remind_me
+                    SET sent = FALSE, date_to_remind = :until
+                    WHERE id = ANY(:ids) AND repeat_every IS NULL
+                    RETURNING id
+                ),
+                copied AS (
+                    INSERT INTO remind_me
+                        (reminder_location, author_id, date_to_remind, message, sent)
+                    SELECT reminder_location, author_id, :until, message, FALSE
+                    FROM remind_me
+                    WHERE id = ANY(:ids) AND repeat_every IS NOT NULL
+                    RETURNING id
+                )
+                SELECT id FROM resent UNION ALL SELECT id FROM copied
+            """
+            result = await database.query(statement, ids=ids, until=until)
+        except Exception as e:
+            log.error("snoozing reminders broke", exc_info=e)
+            return
+
+        for reminder in result:
+            self.schedule(reminder["id"], until)
+        channel = self.bot.get_channel(payload.channel_id)
+        if channel is not None:
+            minutes = SNOOZE.total_seconds() // 60
+            await channel.send(
+                f"<@{payload.user_id}> snoozed, I'll remind you again in {minutes:.0f} minutes.",
+                delete_after=30,
+            )
+
+
+def reminder_text(reminder: dict) -> str:
+    """A reminder as it's shown among others, clipped to fit an embed on its own."""
+    text = f"<@{reminder['author_id']}> {reminder['message']}"
+    return text[:EMBED_LIMIT]
+
+
+def batch_reminders(reminders: List[dict]) -> Iterator[List[dict]]:
+    """Split one channel's reminders into groups that each fit in one embed."""
+    batch = []
+    size = 0
+    for reminder in reminders:
+        # Joined with a blank line, two characters.
+        length = len(reminder_text(reminder)) + 2
+        if batch and (size + length > EMBED_LIMIT or len(batch) == BATCH_SIZE):
+            yield batch
+            batch = []
+            size = 0
+        batch.append(reminder)
+        size += length
+    if batch:
+        yield batch
 
 
 def setup(bot: Bot) -> None:
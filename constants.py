@@ -205,6 +205,17 @@ class Db(metaclass=YAMLGetter):
     host: str
     user: str
     password: str
+    pool_size: int
+    pool_timeout: int
+    queue_size: int
+
+
+class Bank(metaclass=YAMLGetter):
+    section = "bank"
+
+    ledger_flush_size: int
+    ledger_flush_interval: int
+    balance_cache_size: int
 
 
 class Sentry(metaclass=YAMLGetter):
@@ -218,6 +229,36 @@ class Finnhub(metaclass=YAMLGetter):
 
     token: str
     url: str
+    timeout: int
+    retries: int
+    backoff: float
+    rate_limit: int
+    burst: int
+    quote_ttl_open: int
+    quote_ttl_closed: int
+    quote_cache_size: int
+    search_cache_size: int
+    search_cache_mb: int
+    search_cache_ttl: int
+    price_snapshot_interval: int
+    symbol_index: str
+    symbol_index_max_age: int
+
+
+class Reminder(metaclass=YAMLGetter):
+    section = "reminder"
+
+    resync_interval: int
+    snooze_minutes: int
+    min_repeat_minutes: int
+
+
+class Connect4(metaclass=YAMLGetter):
+    section = "connect4"
+
+    ai_workers: int
+    ai_move_seconds: float
+    ai_depth: dict
 
 
 class Shop_emoji(metaclass=YAMLGetter):
@@ -6,7 +6,8 @@ from discord.ext import commands
 
 import constants
 import logs
-from tools import database
+from tools import database, migrations
+from tools.bank import ledger
 
 log = logging.getLogger(__name__)
 bot = commands.Bot(
@@ -47,8 +48,11 @@ async def on_message(message: discord.Message):
 
 
 if __name__ == "__main__":
-    # Attempt to create the db, tables, and columns for Raphael.
+    # Open the connection pool shared by every cog, then create the tables for Raphael
+    # and bring their indexes and columns up to the latest schema version.
+    database.connect()
     database.setup_db()
+    migrations.migrate()
 
     # Recursively loads in all the cogs in the folder named cogs.
     # Skips over any cogs that start with '__' or do not end with .py.
@@ -59,4 +63,9 @@ if __name__ == "__main__":
             bot.load_extension(cog.replace("/", ".")[:-3])
 
     # Finally, run the bot.
-    bot.run(constants.Bot.token)
+    try:
+        bot.run(constants.Bot.token)
+    finally:
+        # Write any deferred ledger entries before the pool goes away.
+        ledger.close()
+        database.close()
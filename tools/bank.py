@@ -1,16 +1,484 @@
+import asyncio
 import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 import dataset
 import discord
 
-from tools import database
+import constants
+from tools import database, rng
 
 log = logging.getLogger(__name__)
 
+# Balance given to a user that has no bank transactions yet.
+DEFAULT_BALANCE = 500
+
+# When deferred ledger entries are written, see `bank` in config-default.yml.
+FLUSH_SIZE = constants.Bank.ledger_flush_size
+FLUSH_INTERVAL = constants.Bank.ledger_flush_interval
+# Most balances kept in memory by `balance_cache`.
+CACHE_SIZE = constants.Bank.balance_cache_size
+
+
+class LedgerEntry(NamedTuple):
+    """One change to a user's balance, a row of the `bank` table."""
+
+    author_id: int
+    amount: float
+    reason: str
+    timestamp: datetime
+    # Seed of the game the entry pays for and its hash, see `tools.rng.GameRNG`.
+    seed: Optional[str] = None
+    seed_hash: Optional[str] = None
+
+
+def _balance(db: dataset.Database, author_id: int, lock: bool = False) -> float:
+    """Database job: the current balance of a user.
+
+    `lock` holds the user's balance row until the transaction ends.
+    """
+    statement = "SELECT balance FROM balances WHERE author_id = :author_id"
+    if lock:
+        statement += " FOR UPDATE"
+    for row in db.query(statement, author_id=author_id):
+        return float(row["balance"])
+
+    # If there was no result for the user, default balance is given.
+    return float(DEFAULT_BALANCE)
+
+
+def _post_entries(db: dataset.Database, entries: List[LedgerEntry]) -> Dict[int, float]:
+    """Database job: record entries in order and return the new balances by user id.
+
+    Every balance and ledger row is written by a single statement. The upsert locks
+    the balance rows in id order, so concurrent payments to the same user queue up
+    instead of racing and two opposing transfers can't deadlock.
+    Each ledger row's opening balance accounts for the entries before it.
+    """
+    params = dict(opening=DEFAULT_BALANCE)
+    values = []
+    for i, entry in enumerate(entries):
+        values.append(
+            f"(CAST(:seq_{i} AS INTEGER), CAST(:author_{i} AS BIGINT), "
+            f"CAST(:amount_{i} AS FLOAT), CAST(:reason_{i} AS TEXT), "
+            f"CAST(:timestamp_{i} AS TIMESTAMP), CAST(:seed_{i} AS TEXT), "
+            f"CAST(:seed_hash_{i} AS TEXT))"
+        )
+        params.update(
+            {
+                f"seq_{i}": i,
+                f"author_{i}": entry.author_id,
+                f"amount_{i}": entry.amount,
+                f"reason_{i}": entry.reason,
+                f"timestamp_{i}": entry.timestamp,
+                f"seed_{i}": entry.seed,
+                f"seed_hash_{i}": entry.seed_hash,
+            }
+        )
+
+    statement = f"""
+        WITH entries (seq, author_id, amount, reason, timestamp, seed, seed_hash) AS (
+            VALUES {", ".join(values)}
+        ),
+        totals AS (
+            SELECT author_id, SUM(amount) AS amount, MAX(timestamp) AS timestamp
+            FROM entries
+            GROUP BY author_id
+        ),
+        moved AS (
+            INSERT INTO balances AS current (author_id, balance, timestamp)
+            SELECT author_id, :opening + amount, timestamp
+            FROM totals
+            ORDER BY author_id
+            ON CONFLICT (author_id) DO UPDATE
+            SET balance = current.balance + EXCLUDED.balance - :opening,
+                timestamp = EXCLUDED.timestamp
+            RETURNING author_id, balance
+        ),
+        ledger AS (
+            INSERT INTO bank (
+                author_id, opening_balance, transaction_amount, reason, timestamp,
+                seed, seed_hash
+            )
+            SELECT
+                author_id,
+                moved.balance - SUM(entries.amount) OVER (
+                    PARTITION BY author_id ORDER BY entries.seq DESC
+                ),
+                entries.amount,
+                entries.reason,
+                entries.timestamp,
+                entries.seed,
+                entries.seed_hash
+            FROM entries JOIN moved USING (author_id)
+            ORDER BY entries.seq
+        )
+        SELECT author_id, balance FROM moved
+        """
+    return {
+        row["author_id"]: float(row["balance"]) for row in db.query(statement, **params)
+    }
+
+
+def _record_ledger(
+    db: dataset.Database,
+    author_id: int,
+    amount: float,
+    reason: str,
+    extra: Optional[Callable[[dataset.Database], Any]] = None,
+) -> Dict[int, float]:
+    """Database job: add a ledger row for a user and return their new balance by user id."""
+    entry = LedgerEntry(author_id, amount, reason, datetime.now())
+    balances = _post_entries(db, [entry])
+    if extra is not None:
+        extra(db)
+    return balances
+
+
+class InsufficientFunds(Exception):
+    """Raised when a transfer would overdraw its payer, nothing is recorded."""
+
+    def __init__(self, user: discord.abc.User, balance: float, amount: float):
+        self.user = user
+        self.balance = balance
+        self.amount = amount
+        super().__init__(
+            f"{user.name} cannot pay {amount:,.2f} with a balance of {balance:,.2f}"
+        )
+
+
+def _transfer(
+    db: dataset.Database,
+    payer_id: Optional[int],
+    payee_id: Optional[int],
+    amount: float,
+    reason: str,
+    extra: Optional[Callable[[dataset.Database], Any]] = None,
+    seed: Optional[str] = None,
+) -> Dict[int, float]:
+    """Database job: move `amount` from payer to payee, returns the new balances by user id.
+
+    None on either side is the house, which mints or burns coin and keeps no balance.
+    The caller checks the payer's new balance and raises to roll everything back.
+    """
+    timestamp = datetime.now()
+    seed_hash = None if seed is None else rng.commit(seed)
+    balances = _post_entries(
+        db,
+        [
+            LedgerEntry(author_id, change, reason, timestamp, seed, seed_hash)
+            for author_id, change in ((payer_id, -amount), (payee_id, amount))
+            if author_id is not None
+        ],
+    )
+    if extra is not None:
+        extra(db)
+    return balances
+
+
+class BalanceCache:
+    """Least recently used cache of the balances stored in the database, keyed on user id.
+
+    Every write goes through `begin_write()` and `end_write()`, so the cache
+    is updated with the balances the database returned. A read that missed only
+    fills the cache if no write started since it began, so it can't put back a stale
+    balance. Users written by overlapping jobs are dropped instead of updated,
+    as their jobs may finish in a different order than they committed.
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self.balances: "OrderedDict[int, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped by every write, see `fill()`.
+        self.writes = 0
+        # Jobs in flight per user, and users that had more than one at once.
+        self._writing: Dict[int, int] = {}
+        self._contended: Set[int] = set()
+
+    def get(self, author_id: int) -> Optional[float]:
+        """The cached balance of a user, None if it has to be read from the database."""
+        balance = self.balances.get(author_id)
+        if balance is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.balances.move_to_end(author_id)
+        return balance
+
+    def fill(self, author_id: int, balance: float, writes: int) -> None:
+        """Cache a balance read from the database, `writes` is `self.writes` from before the read."""
+        if writes == self.writes and author_id not in self._writing:
+            self._put(author_id, balance)
+
+    def begin_write(self, author_ids: Iterable[int]) -> None:
+        self.writes += 1
+        for author_id in author_ids:
+            if author_id in self._writing:
+                self._contended.add(author_id)
+            self._writing[author_id] = self._writing.get(author_id, 0) + 1
+
+    def end_write(
+        self, author_ids: Iterable[int], balances: Optional[Dict[int, float]]
+    ) -> None:
+        """Store the new balances, or drop the users if the job failed."""
+        self.writes += 1
+        for author_id in author_ids:
+            self._writing[author_id] -= 1
+            if balances is None or author_id in self._contended:
+                self.balances.pop(author_id, None)
+            else:
+                self._put(author_id, balances[author_id])
+            if not self._writing[author_id]:
+                del self._writing[author_id]
+                self._contended.discard(author_id)
+
+    def _put(self, author_id: int, balance: float) -> None:
+        self.balances[author_id] = balance
+        self.balances.move_to_end(author_id)
+        while len(self.balances) > self.maxsize:
+            self.balances.popitem(last=False)
+            self.evictions += 1
+
+    def status(self) -> dict:
+        """Snapshot of the cache's size and hit ratio."""
+        lookups = self.hits + self.misses
+        return dict(
+            size=len(self.balances),
+            maxsize=self.maxsize,
+            hits=self.hits,
+            misses=self.misses,
+            hit_ratio=self.hits / lookups if lookups else 0.0,
+            evictions=self.evictions,
+        )
+
+
+balance_cache = BalanceCache()
+
+
+async def _write(
+    author_ids: Tuple[int, ...], func: Callable, *args: Any
+) -> Dict[int, float]:
+    """Run a job returning new balances by user id, and write them through to the cache."""
+    balances = None
+    balance_cache.begin_write(author_ids)
+    try:
+        balances = await database.run(func, *args)
+        return balances
+    finally:
+        balance_cache.end_write(author_ids, balances)
+
+
+async def _read(author_id: int) -> float:
+    """The balance of a user as stored in the database, from the cache when possible."""
+    balance = balance_cache.get(author_id)
+    if balance is None:
+        writes = balance_cache.writes
+        balance = await database.run(_balance, author_id)
+        balance_cache.fill(author_id, balance, writes)
+    return balance
+
+
+class _LedgerBatch:
+    """The entries one flush writes, and whether its database job has started on them.
+
+    The job claims the batch before writing and a cancelled flush abandons it, both
+    under one thread lock, so either the entries get written or the job skips them.
+    """
+
+    def __init__(self, entries: List[LedgerEntry]):
+        self.entries = entries
+        self.author_ids = tuple({entry.author_id for entry in entries})
+        self.started = False
+        self.abandoned = False
+        self._lock = threading.Lock()
+
+    def post(self, db: dataset.Database) -> Optional[Dict[int, float]]:
+        """Database job: write the entries, unless the batch was abandoned first."""
+        with self._lock:
+            self.started = not self.abandoned
+        if not self.started:
+            return None
+        return _post_entries(db, self.entries)
+
+    def abandon(self) -> bool:
+        """Stop the job from writing the entries, returns False if it already started."""
+        with self._lock:
+            self.abandoned = not self.started
+            return self.abandoned
+
+    async def write(self) -> None:
+        """Run the job, cancelling only stops it if it hasn't started writing yet.
+
+        Once it has, cancellation waits for it to finish and is raised after, so the
+        caller can tell from `started` whether the entries were written.
+        """
+        job = asyncio.ensure_future(_write(self.author_ids, self.post))
+        cancelled = False
+        while True:
+            try:
+                await asyncio.shield(job)
+                break
+            except asyncio.CancelledError:
+                if self.abandon():
+                    job.cancel()
+                    raise
+                cancelled = True
+        if cancelled:
+            raise asyncio.CancelledError
+
+
+class LedgerWriter:
+    """Write-behind buffer for frequent ledger entries, such as game payouts.
+
+    Entries are kept in the order they were made and written together by `flush()`,
+    once `FLUSH_SIZE` are waiting or `FLUSH_INTERVAL` seconds after the first one.
+    A failed flush, or one cancelled before its job started, puts its entries back
+    at the front, so nothing is lost or reordered.
+    Balance reads for users with entries waiting go through `lock`, which `flush()`
+    holds, so an entry is never counted both in the database and in memory.
+    """
+
+    def __init__(self, size: int = FLUSH_SIZE, interval: float = FLUSH_INTERVAL):
+        self.size = size
+        self.interval = interval
+        self.pending: List[LedgerEntry] = []
+        # The batch `flush()` is writing right now.
+        self.flushing: List[LedgerEntry] = []
+        self._batch: Optional[_LedgerBatch] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Strong references to scheduled flushes so they aren't garbage collected.
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def record(self, author_id: int, amount: float, reason: str = "") -> None:
+        """Queue a ledger entry to be written by the next flush."""
+        self.pending.append(LedgerEntry(author_id, amount, reason, datetime.now()))
+        if len(self.pending) >= self.size:
+            self.schedule_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.interval, self.schedule_flush
+            )
+
+    def has_pending(self, *author_ids: int) -> bool:
+        """Whether any of the users have entries that aren't in the database yet."""
+        return any(
+            entry.author_id in author_ids for entry in self.pending + self.flushing
+        )
+
+    def pending_total(self, author_id: int) -> float:
+        """Sum of a user's entries waiting to be written."""
+        return sum(
+            entry.amount for entry in self.pending if entry.author_id == author_id
+        )
+
+    def schedule_flush(self) -> None:
+        """Start a flush in the background."""
+        task = asyncio.ensure_future(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._flushed)
+
+    def _flushed(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        # A failed flush was logged and queued again, retrieve it so it isn't reported twice.
+        if not task.cancelled():
+            task.exception()
+
+    async def flush(self) -> None:
+        """Write every pending entry as one multi-row statement."""
+        async with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self.pending:
+                return
+
+            self.flushing, self.pending = self.pending, []
+            self._batch = _LedgerBatch(self.flushing)
+            try:
+                await self._batch.write()
+            except asyncio.CancelledError:
+                if not self._batch.started:
+                    self.pending[:0] = self.flushing
+                raise
+            except Exception:
+                log.exception(
+                    f"Ledger flush of {len(self.flushing)} entries failed, retrying later."
+                )
+                self.pending[:0] = self.flushing
+                # `record()` may have set a timer while this flush was writing.
+                if self._timer is not None:
+                    self._timer.cancel()
+                self._timer = asyncio.get_running_loop().call_later(
+                    self.interval, self.schedule_flush
+                )
+                raise
+            finally:
+                self.flushing = []
+                self._batch = None
+
+    async def settle(self, *author_ids: int) -> None:
+        """Flush first if any of the users have entries waiting, used before writing directly."""
+        if self.has_pending(*author_ids):
+            await self.flush()
+
+    def close(self) -> None:
+        """Write whatever is still pending without the event loop, used when the bot shuts down.
+
+        A batch whose flush never finished is written too, unless its job already
+        started, the database executor finishes that one when it shuts down.
+        """
+        entries = self.pending
+        if self._batch is not None and self._batch.abandon():
+            entries = self.flushing + entries
+        if entries:
+            log.info(f"Writing {len(entries)} pending ledger entries.")
+            with database.transaction() as db:
+                _post_entries(db, entries)
+            balance_cache.balances.clear()
+        self.pending = []
+        self.flushing = []
+        self._batch = None
+
+
+ledger = LedgerWriter()
+
 
 class Bank:
+    """A user's coin balance, read from `balances` and recorded in the `bank` ledger table.
+
+    Constructing a Bank does not touch the database, await it to load the balance:
+        >bank = await Bank(ctx.author)
+        >if bank < bet: ...
+
+    Mutations are coroutines and keep `balance` up to date:
+        >await Bank(ctx.author).add(winnings, "Cups game")
+    """
+
     def __init__(self, user: Union[discord.User, discord.Member, discord.ClientUser]):
         # Note: discord.ClientUser is the bot itself.
         if not isinstance(user, (discord.User, discord.Member, discord.ClientUser)):
@@ -18,7 +486,15 @@ class Bank:
                 f"Object given was not a User nor Member object.\n\tType given: {type(user)}"
             )
         self.user = user
-        self.balance = self.__balance__()
+        self.balance: Optional[float] = None
+
+    def __await__(self):
+        """Load the balance without blocking the event loop, evaluates to the bank itself."""
+        return self.__load__().__await__()
+
+    async def __load__(self) -> "Bank":
+        self.balance = await self.__balance__()
+        return self
 
     def __str__(self) -> str:
         """<name>'s balance is $<balance>."""
@@ -66,69 +542,148 @@ class Bank:
     def __float__(self) -> bool:
         return self.balance
 
-    def __balance__(self) -> float:
-        """Get the balance of a user."""
-
-        with dataset.connect(database.get_db()) as db:
-            # Find last bank transaction.
-            statement = statement = f"""
-                SELECT opening_balance, transaction_amount
-                FROM bank
-                WHERE author_id = {self.user.id}
-                ORDER BY id DESC
-                LIMIT 1
-                """
-            result = db.query(statement)
-
-        for row in result:
-            balance = row["opening_balance"] + row["transaction_amount"]
-            break
-        else:
-            # If there was no result for the user, default balance is given.
-            balance = 500
+    async def __balance__(self) -> float:
+        """Get the balance of a user, including ledger entries that haven't been written yet."""
+
+        if not ledger.has_pending(self.user.id):
+            return await _read(self.user.id)
+
+        async with ledger.lock:
+            return await _read(self.user.id) + ledger.pending_total(self.user.id)
 
-        return float(balance)
+    async def add(
+        self,
+        amount: float,
+        reason: str = "",
+        extra: Optional[Callable[[dataset.Database], Any]] = None,
+        defer: bool = False,
+    ) -> "Bank":
+        """Add to a user's balance.
 
-    def add(self, amount: float, reason: str = "") -> "Bank":
-        """Add to a user's balance."""
+        `extra(db)` is run in the same transaction, for writes that must land with the payment.
+        `defer` hands the entry to the batching ledger writer instead of writing it now,
+        for frequent game payouts, it can't be combined with `extra`.
+        """
 
         if amount == 0:  # Pointless, do nothing.
             return 0
 
-        self.__record_ledger__(amount, reason)
-        self.balance += amount
+        await self.__record_ledger__(amount, reason, extra, defer)
         return self
 
-    def subtract(self, amount: float, reason: str = "") -> "Bank":
-        """Subtract from a user's balance."""
+    async def subtract(
+        self,
+        amount: float,
+        reason: str = "",
+        extra: Optional[Callable[[dataset.Database], Any]] = None,
+        defer: bool = False,
+    ) -> "Bank":
+        """Subtract from a user's balance.
+
+        `extra(db)` is run in the same transaction, for writes that must land with the payment.
+        `defer` hands the entry to the batching ledger writer instead of writing it now,
+        for frequent game payouts, it can't be combined with `extra`.
+        """
 
         if amount == 0:  # Pointless, do nothing.
             return 0
 
-        self.__record_ledger__(-amount, reason)
-        self.balance -= amount
+        await self.__record_ledger__(-amount, reason, extra, defer)
         return self
 
-    def set(self, amount: float, reason: str = "") -> "Bank":
+    async def set(self, amount: float, reason: str = "") -> "Bank":
         """Set a user's balance."""
 
-        self.__record_ledger__(amount - self.balance, reason)  # Because math
-        self.balance = amount
+        def job(db: dataset.Database) -> Dict[int, float]:
+            # Read and write in one job so the difference can't go stale in between.
+            return _record_ledger(
+                db, self.user.id, amount - _balance(db, self.user.id, lock=True), reason
+            )
+
+        await ledger.settle(self.user.id)
+        self.balance = (await _write((self.user.id,), job))[self.user.id]
         return self
 
-    def __record_ledger__(self, amount: float, reason: str = "") -> None:
-        with dataset.connect(database.get_db()) as db:
-            # Find last bank transaction
-            db["bank"].insert(
-                dict(
-                    author_id=self.user.id,
-                    opening_balance=self.balance,
-                    transaction_amount=amount,
-                    reason=reason,
-                    timestamp=datetime.now(),
-                )
+    @classmethod
+    async def transfer(
+        cls,
+        src: Optional[discord.abc.User],
+        dst: Optional[discord.abc.User],
+        amount: float,
+        reason: str = "",
+        extra: Optional[Callable[[dataset.Database], Any]] = None,
+        seed: Optional[str] = None,
+    ) -> Tuple[Optional["Bank"], Optional["Bank"]]:
+        """Move coin from `src` to `dst` in one transaction and one round trip.
+
+        Pass None as `src` to pay out from the house, or as `dst` to pay the house,
+        such as for a bet or a purchase. Raises InsufficientFunds, and records
+        nothing, if `src` cannot cover `amount`.
+        `extra(db)` is run in the same transaction, for writes that must land with the payment.
+        `seed` is the seed of the game the transfer pays for, stored with its hash on the
+        ledger rows so the game can be checked and replayed, see `tools.rng.GameRNG`.
+        Returns the banks of `src` and `dst` with their new balances.
+
+        Example:
+            >try:
+            >    await Bank.transfer(ctx.author, None, bet, "Cups game")
+            >except InsufficientFunds:
+            >    ...
+        """
+
+        if amount <= 0:
+            raise ValueError(f"Transfers must be of a positive amount, not {amount}")
+        if src is not None and dst is not None and src.id == dst.id:
+            raise ValueError("Cannot transfer to the same user")
+
+        payer = None if src is None else cls(src)
+        payee = None if dst is None else cls(dst)
+
+        def job(db: dataset.Database) -> Dict[int, float]:
+            balances = _transfer(
+                db,
+                None if payer is None else payer.user.id,
+                None if payee is None else payee.user.id,
+                amount,
+                reason,
+                extra,
+                seed,
             )
-            db.commit()
+            if payer is not None and balances[payer.user.id] < 0:
+                # Raising rolls back the whole transfer.
+                raise InsufficientFunds(
+                    payer.user, balances[payer.user.id] + amount, amount
+                )
+            return balances
+
+        author_ids = tuple(bank.user.id for bank in (payer, payee) if bank is not None)
+        await ledger.settle(*author_ids)
+        balances = await _write(author_ids, job)
+        for bank in (payer, payee):
+            if bank is not None:
+                bank.balance = balances[bank.user.id]
+        return payer, payee
+
+    async def __record_ledger__(
+        self,
+        amount: float,
+        reason: str = "",
+        extra: Optional[Callable[[dataset.Database], Any]] = None,
+        defer: bool = False,
+    ) -> None:
+        if defer:
+            if extra is not None:
+                raise ValueError("Deferred ledger entries can't run extra writes")
+            ledger.record(self.user.id, amount, reason)
+            self.balance = await self.__balance__()
+            return
+
+        # Earlier deferred entries go first so the ledger stays in order.
+        await ledger.settle(self.user.id)
+        balances = await _write(
+            (self.user.id,), _record_ledger, self.user.id, amount, reason, extra
+        )
+        self.balance = balances[self.user.id]
 
     def name(self) -> str:
         """Return bank owner's name."""
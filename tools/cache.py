@@ -0,0 +1,295 @@
+import asyncio
+import functools
+import sys
+import time
+import weakref
+from collections import OrderedDict
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+# Returned by `TTLCache.get()` for a key that isn't cached, None is a valid value.
+MISSING = object()
+
+# Seconds to keep a value, or a function of the value returning them.
+TTL = Union[float, Callable[[Any], float]]
+
+
+def sizeof(value: Any) -> int:
+    """Approximate bytes used by a value, including the containers and strings inside it."""
+    seen = set()
+    stack = [value]
+    size = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return size
+
+
+class TTLCache:
+    """Least recently used cache whose entries also expire after a time to live.
+
+    The cache holds at most `maxsize` entries and, if `maxbytes` is given,
+    about that many bytes as measured by `sizeof()`.
+    `ttl` may be a function of the value, to keep some values longer than others.
+
+    `fetch()` and `fetch_many()` fill the cache from an async function. Keys that are
+    already being fetched wait for that fetch instead of starting their own,
+    so a burst of lookups for an expired key makes one call. Failures aren't cached.
+
+    Example:
+        >cache = TTLCache(maxsize=1000, ttl=60)
+        >quote = await cache.fetch("AAPL", lambda: finnhub.quote("AAPL"))
+    """
+
+    def __init__(
+        self, maxsize: int = 128, ttl: TTL = 60.0, maxbytes: Optional[int] = None
+    ):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.ttl = ttl
+        # Key to its value, when it expires and its size, least recently used first.
+        self.entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self.bytes = 0
+        # Keys being fetched, resolving to their value or MISSING if it wasn't found.
+        self._fetching: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """The cached value of a key, `default` if it's missing or expired."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if entry[1] <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[TTL] = None) -> None:
+        """Cache a value, evicting the least recently used entries if the cache is full."""
+        ttl = self.ttl if ttl is None else ttl
+        if callable(ttl):
+            ttl = ttl(value)
+        if key in self.entries:
+            self._remove(key)
+
+        size = sizeof(value)
+        self.entries[key] = (value, time.monotonic() + ttl, size)
+        self.bytes += size
+        while len(self.entries) > self.maxsize or (
+            self.maxbytes is not None
+            and self.bytes > self.maxbytes
+            and len(self.entries) > 1
+        ):
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key and return its value, even if it has expired."""
+        if key not in self.entries:
+            return default
+        return self._remove(key)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.bytes = 0
+
+    def prune(self) -> int:
+        """Remove every expired entry, returns how many there were."""
+        now = time.monotonic()
+        expired = [
+            key for key, (_, expires, _) in self.entries.items() if expires <= now
+        ]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def _remove(self, key: Hashable) -> Any:
+        value, _, size = self.entries.pop(key)
+        self.bytes -= size
+        return value
+
+    async def fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """The value of a key, calling `fetch()` for it if it isn't cached."""
+
+        async def fetch_one(keys: List[Hashable]) -> Dict[Hashable, Any]:
+            return {key: await fetch()}
+
+        values = await self.fetch_many([key], fetch_one)
+        if key not in values:
+            # The fetch we waited for was cancelled, make our own.
+            return await self.fetch(key, fetch)
+        return values[key]
+
+    async def fetch_many(
+        self,
+        keys: Iterable[Hashable],
+        fetch: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+    ) -> Dict[Hashable, Any]:
+        """Values by key, the keys that aren't cached are fetched with one `fetch(keys)` call.
+
+        `fetch` returns a dict of the values it found, keys it left out are left out
+        of the result and not cached.
+        """
+        values = {}
+        waiting = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            value = self.get(key)
+            if value is not MISSING:
+                values[key] = value
+            elif key in self._fetching:
+                # Counted as a miss by `get()`, but it costs no extra call.
+                self.misses -= 1
+                self.coalesced += 1
+                waiting[key] = self._fetching[key]
+            else:
+                missing.append(key)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in missing}
+            self._fetching.update(futures)
+            fetched = {}
+            try:
+                fetched = await fetch(missing)
+            except Exception as e:
+                for future in futures.values():
+                    future.set_exception(e)
+                    # Waiters re-raise it, stop asyncio logging it when there are none.
+                    future.exception()
+                raise
+            finally:
+                for key, future in futures.items():
+                    del self._fetching[key]
+                    value = fetched.get(key, MISSING)
+                    if value is not MISSING:
+                        self.set(key, value)
+                        values[key] = value
+                    if not future.done():
+                        future.set_result(value)
+
+        for key, future in waiting.items():
+            value = await asyncio.shield(future)
+            if value is not MISSING:
+                values[key] = value
+        return values
+
+    def status(self) -> dict:
+        """Snapshot of the cache's size and hit ratio, coalesced lookups count as hits."""
+        lookups = self.hits + self.coalesced + self.misses
+        return dict(
+            size=len(self.entries),
+            maxsize=self.maxsize,
+            bytes=self.bytes,
+            hits=self.hits,
+            coalesced=self.coalesced,
+            misses=self.misses,
+            evictions=self.evictions,
+            expirations=self.expirations,
+            hit_ratio=(self.hits + self.coalesced) / lookups if lookups else 0.0,
+        )
+
+
+class CachedMethod:
+    """Async method memoized in a `TTLCache` of each instance, see `cached()`."""
+
+    def __init__(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        key: Callable[..., Hashable],
+        options: dict,
+    ):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.key = key
+        self.options = options
+        self.name = func.__name__
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        if instance is None:
+            return self
+
+        cache = TTLCache(**self.options)
+        # The method is stored on the instance, a strong reference back would be a cycle.
+        ref = weakref.ref(instance)
+
+        @functools.wraps(self.func)
+        async def method(*args: Any, **kwargs: Any) -> Any:
+            return await cache.fetch(
+                self.key(*args, **kwargs), lambda: self.func(ref(), *args, **kwargs)
+            )
+
+        method.cache = cache
+        # Shadow the descriptor, later lookups on this instance find the same cache.
+        instance.__dict__[self.name] = method
+        return method
+
+
+def _make_key(*args: Any, **kwargs: Any) -> Hashable:
+    if not kwargs:
+        return args[0] if len(args) == 1 else args
+    return args + tuple(sorted(kwargs.items()))
+
+
+def cached(
+    maxsize: int = 128,
+    ttl: TTL = 60.0,
+    maxbytes: Optional[int] = None,
+    key: Callable[..., Hashable] = _make_key,
+) -> Callable[[Callable[..., Awaitable[Any]]], CachedMethod]:
+    """Memoize an async method, bounded and expiring unlike `functools.lru_cache`.
+
+    Every instance gets its own cache, reachable as `instance.method.cache`, and it
+    only refers back to the instance weakly, so both are freed together once the
+    instance is gone, without waiting on the cycle collector.
+    Arguments are the cache key unless `key` maps them to one, they must be hashable.
+    Exceptions aren't cached, the next call tries again.
+
+    Example:
+        >class Stonks(Cog):
+        >    @cached(maxsize=1000, ttl=60 * 60)
+        >    async def stock_query(self, query: str) -> dict:
+        >        return await self.finnhub.search(query)
+    """
+
+    def decorator(func: Callable[..., Awaitable[Any]]) -> CachedMethod:
+        return CachedMethod(
+            func, key, dict(maxsize=maxsize, ttl=ttl, maxbytes=maxbytes)
+        )
+
+    return decorator
@@ -0,0 +1,275 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Size of the board, columns are numbered from the left and rows from the bottom.
+WIDTH = 7
+HEIGHT = 6
+# Each column takes HEIGHT + 1 bits, the spare bit on top keeps lines of four from
+# wrapping into the next column when the bitboards are shifted.
+# Bit `column * (HEIGHT + 1) + row` is the cell at that column and row.
+_COLUMN_BITS = HEIGHT + 1
+
+# The lowest cell of each column and the top cell of each column.
+_BOTTOM = [1 << (column * _COLUMN_BITS) for column in range(WIDTH)]
+_TOP = [1 << (HEIGHT - 1 + column * _COLUMN_BITS) for column in range(WIDTH)]
+# Every playable cell, full when all the columns are.
+BOARD_MASK = sum(
+    ((1 << HEIGHT) - 1) << (column * _COLUMN_BITS) for column in range(WIDTH)
+)
+
+# How far apart neighbouring cells of a line are: vertical, horizontal,
+# diagonal going down to the right and diagonal going up to the right.
+_DIRECTIONS = (1, _COLUMN_BITS, _COLUMN_BITS - 1, _COLUMN_BITS + 1)
+
+
+def has_four(stones: int) -> bool:
+    """Whether a player's bitboard holds four in a row in any direction."""
+    for shift in _DIRECTIONS:
+        # Cells with a stone next to them, then pairs of those two apart.
+        pairs = stones & (stones >> shift)
+        if pairs & (pairs >> (2 * shift)):
+            return True
+    return False
+
+
+class Board:
+    """A Connect Four board stored as bitboards, so moves and win checks are a few integer ops.
+
+    Player 0 moves first. `mask` holds every checker and `position` the checkers
+    of the player whose turn it is, the other player's are `position ^ mask`.
+
+    Example:
+        >board = Board()
+        >if board.can_play(3):
+        >    won = board.play(3)
+        >board.cell(3, 0)  # 0, player 0's checker at the bottom of the middle column.
+    """
+
+    __slots__ = ("position", "mask", "moves")
+
+    def __init__(self, position: int = 0, mask: int = 0, moves: int = 0):
+        self.position = position
+        self.mask = mask
+        self.moves = moves
+
+    def copy(self) -> "Board":
+        return Board(self.position, self.mask, self.moves)
+
+    @property
+    def turn(self) -> int:
+        """The player to move next, 0 or 1."""
+        return self.moves & 1
+
+    def stones(self, player: int) -> int:
+        """The bitboard of one player's checkers."""
+        if player == self.turn:
+            return self.position
+        return self.position ^ self.mask
+
+    def cell(self, column: int, row: int) -> Optional[int]:
+        """The player whose checker is at `column` and `row`, None if it's empty."""
+        bit = 1 << (column * _COLUMN_BITS + row)
+        if not self.mask & bit:
+            return None
+        return self.turn if self.position & bit else self.turn ^ 1
+
+    def height(self, column: int) -> int:
+        """How many checkers are in a column."""
+        return bin(self.mask & (_TOP[column] * 2 - _BOTTOM[column])).count("1")
+
+    def can_play(self, column: int) -> bool:
+        """Whether a checker can be dropped in `column`, False if it's full or off the board."""
+        return 0 <= column < WIDTH and not self.mask & _TOP[column]
+
+    def legal_moves(self) -> int:
+        """A bitboard of the cell each non-full column's next checker lands in."""
+        return (self.mask + sum(_BOTTOM)) & BOARD_MASK
+
+    def columns(self) -> List[int]:
+        """The columns that aren't full, left to right."""
+        return [column for column in range(WIDTH) if not self.mask & _TOP[column]]
+
+    def is_winning_move(self, column: int) -> bool:
+        """Whether dropping a checker in `column` connects four for the player to move."""
+        landing = (self.mask + _BOTTOM[column]) & (_TOP[column] * 2 - _BOTTOM[column])
+        return has_four(self.position | landing)
+
+    def play(self, column: int) -> bool:
+        """Drop the player to move's checker in `column`, returns whether it connected four.
+
+        Raises ValueError if the column is full or off the board.
+        """
+        if not self.can_play(column):
+            raise ValueError(f"Column {column} can't be played")
+        # The mover's checkers, adding one to a column's stones carries into its next free cell.
+        self.position ^= self.mask
+        self.mask |= self.mask + _BOTTOM[column]
+        self.moves += 1
+        return has_four(self.position ^ self.mask)
+
+    def is_full(self) -> bool:
+        """Whether every cell is taken, a draw if the last move didn't win."""
+        return self.mask == BOARD_MASK
+
+    def winner(self) -> Optional[int]:
+        """The player with four in a row, None if neither has."""
+        for player in (0, 1):
+            if has_four(self.stones(player)):
+                return player
+        return None
+
+
+# Bot opponent
+
+# Score of a won position, less the moves it took so quicker wins score higher.
+WIN = 1000
+# Columns in the order they're searched, middle first as they take part in the most lines.
+_ORDER = sorted(range(WIDTH), key=lambda column: abs(column - WIDTH // 2))
+_CENTER = (_TOP[WIDTH // 2] * 2) - _BOTTOM[WIDTH // 2]
+
+# Whether a transposition table score is exact or only bounds the real score.
+_EXACT, _LOWER, _UPPER = 0, 1, 2
+
+
+class _OutOfTime(Exception):
+    """Raised inside the search once the move's time budget is spent."""
+
+
+def _winning_cells(stones: int, mask: int) -> int:
+    """Empty cells that would complete four in a row for `stones`."""
+    cells = 0
+    for shift in _DIRECTIONS[1:]:
+        # The gap at either end of three in a row, or in the middle of two and one.
+        pairs = (stones << shift) & (stones << 2 * shift)
+        cells |= pairs & (stones << 3 * shift)
+        cells |= pairs & (stones >> shift)
+        pairs = (stones >> shift) & (stones >> 2 * shift)
+        cells |= pairs & (stones >> 3 * shift)
+        cells |= pairs & (stones << shift)
+    # Vertical lines can only be finished on top.
+    cells |= (stones << 1) & (stones << 2) & (stones << 3)
+    return cells & (BOARD_MASK ^ mask)
+
+
+def evaluate(board: Board) -> int:
+    """Heuristic score of a position for the player to move, by open threes and the middle column."""
+    opponent = board.position ^ board.mask
+    threats = bin(_winning_cells(board.position, board.mask)).count("1")
+    threats -= bin(_winning_cells(opponent, board.mask)).count("1")
+    center = bin(board.position & _CENTER).count("1") - bin(opponent & _CENTER).count(
+        "1"
+    )
+    return 4 * threats + center
+
+
+class Search:
+    """Negamax alpha-beta search with a transposition table, stopping at `deadline`.
+
+    The table is kept across the depths of an iterative deepening search, so each
+    depth starts from the best moves the last one found.
+    """
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.nodes = 0
+        # Position key to the depth searched, score, bound and best column.
+        self.table: Dict[int, Tuple[int, int, int, int]] = {}
+
+    def ordered(self, board: Board, first: Optional[int] = None) -> List[int]:
+        """Playable columns, the table's best move first then the ones making the most threats."""
+        moves = []
+        for column in _ORDER:
+            if board.can_play(column):
+                landing = (board.mask + _BOTTOM[column]) & (
+                    _TOP[column] * 2 - _BOTTOM[column]
+                )
+                threats = _winning_cells(board.position | landing, board.mask | landing)
+                moves.append((column != first, -bin(threats).count("1"), column))
+        # Sorting is stable, so ties stay middle first.
+        moves.sort(key=lambda move: move[:2])
+        return [column for _, _, column in moves]
+
+    def negamax(self, board: Board, depth: int, alpha: int, beta: int) -> int:
+        """Score of `board` for the player to move, searching `depth` moves ahead."""
+        self.nodes += 1
+        if not self.nodes & 1023 and time.monotonic() > self.deadline:
+            raise _OutOfTime
+        if board.is_full():
+            return 0
+        for column in _ORDER:
+            if board.can_play(column) and board.is_winning_move(column):
+                return WIN - board.moves
+        if depth == 0:
+            return evaluate(board)
+
+        key = board.position + board.mask
+        first = None
+        if entry := self.table.get(key):
+            entry_depth, score, bound, first = entry
+            if entry_depth >= depth:
+                if bound == _EXACT:
+                    return score
+                if bound == _LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        original_alpha = alpha
+        best, best_column = -WIN - 1, None
+        for column in self.ordered(board, first):
+            child = board.copy()
+            child.play(column)
+            score = -self.negamax(child, depth - 1, -beta, -alpha)
+            if score > best:
+                best, best_column = score, column
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best <= original_alpha:
+            bound = _UPPER
+        elif best >= beta:
+            bound = _LOWER
+        else:
+            bound = _EXACT
+        self.table[key] = (depth, best, bound, best_column)
+        return best
+
+
+def best_move(board: Board, depth: int, seconds: float) -> int:
+    """The column the bot plays, searching up to `depth` moves ahead within `seconds`.
+
+    Deepens one move at a time and answers with the deepest search that finished,
+    the first one always does. Runs in a process pool, so it takes and returns plain values.
+
+    Raises ValueError if the board is full.
+    """
+    columns = board.columns()
+    if not columns:
+        raise ValueError("The board is full")
+    # Never miss a win.
+    for column in columns:
+        if board.is_winning_move(column):
+            return column
+
+    search = Search(deadline=time.monotonic() + seconds)
+    best = search.ordered(board)[0]
+    for current in range(1, min(depth, WIDTH * HEIGHT - board.moves) + 1):
+        try:
+            scores = {}
+            alpha = -WIN - 1
+            for column in search.ordered(board, best):
+                child = board.copy()
+                child.play(column)
+                scores[column] = -search.negamax(child, current - 1, -WIN - 1, -alpha)
+                alpha = max(alpha, scores[column])
+        except _OutOfTime:
+            # Keep the last finished depth's move, the first depth is too small to run out.
+            break
+        best = max(scores, key=scores.get)
+        # A forced win or loss was found, looking deeper won't change it.
+        if abs(scores[best]) > WIN - WIDTH * HEIGHT:
+            break
+    return best
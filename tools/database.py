@@ -1,6 +1,15 @@
+import asyncio
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, TypeVar
 
 import dataset
+from sqlalchemy import DateTime
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
 
 import constants
 
@@ -10,16 +19,220 @@ DB_HOST = constants.Db.host
 DB_USER = constants.Db.user
 DB_PASSWORD = constants.Db.password
 
+# Bounds for the shared connection pool, see `db` in config-default.yml.
+POOL_SIZE = constants.Db.pool_size
+POOL_TIMEOUT = constants.Db.pool_timeout
+QUEUE_SIZE = constants.Db.queue_size
+
+T = TypeVar("T")
+
+# The one database handle shared by every cog, created by `connect()` at startup.
+_database: Optional[dataset.Database] = None
+# Worker threads that run queries for `run()`, one per pooled connection.
+_executor: Optional[ThreadPoolExecutor] = None
+# Caps how many jobs may be running or queued for `_executor` at once.
+_slots: Optional[asyncio.Semaphore] = None
+
+
+class PoolStats:
+    """Running totals of how the shared pool hands out connections."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.jobs = 0
+        self.in_flight = 0
+        self.queue_total = 0.0
+        self.queue_max = 0.0
+
+    def record_checkout(self, waited: float) -> None:
+        """Count a successful checkout that waited `waited` seconds for a connection."""
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def record_timeout(self) -> None:
+        """Count a checkout that gave up after `POOL_TIMEOUT` seconds."""
+        with self._lock:
+            self.timeouts += 1
+
+    def record_job(self, queued: float) -> None:
+        """Count a `run()` job that sat `queued` seconds before a worker picked it up."""
+        with self._lock:
+            self.jobs += 1
+            self.queue_total += queued
+            self.queue_max = max(self.queue_max, queued)
+
+
+stats = PoolStats()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that times every checkout so pool pressure shows up in `pool_status()`."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeout:
+            stats.record_timeout()
+            raise
+        stats.record_checkout(time.perf_counter() - start)
+        return connection
+
 
 def get_db():
     """Returns the OS friendly path to the postgresql database."""
     return f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_USER}"
 
 
+def connect() -> dataset.Database:
+    """Open the shared database handle and its bounded connection pool.
+
+    Safe to call more than once, every call after the first returns the same handle.
+    """
+    global _database, _executor
+    if _database is None:
+        log.info(f"Opening database pool, {POOL_SIZE} connections.")
+        _database = dataset.connect(
+            get_db(),
+            engine_kwargs=dict(
+                poolclass=MeteredQueuePool,
+                pool_size=POOL_SIZE,
+                max_overflow=0,
+                pool_timeout=POOL_TIMEOUT,
+                pool_recycle=300,
+                pool_pre_ping=True,
+            ),
+        )
+        _executor = ThreadPoolExecutor(
+            max_workers=POOL_SIZE, thread_name_prefix="database"
+        )
+    return _database
+
+
+def close() -> None:
+    """Finish queued jobs and close every pooled connection, used when the bot shuts down."""
+    global _database, _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+        _slots = None
+    if _database is not None:
+        log.info(f"Closing database pool: {pool_status()}")
+        _database.close()
+        _database = None
+
+
+def _release(db: dataset.Database) -> None:
+    """Hand the calling thread's connection back to the pool.
+
+    dataset keeps one connection per thread for the life of the handle,
+    closing it here returns it to the pool instead of pinning it.
+    """
+    with db.lock:
+        connection = db.connections.pop(threading.get_ident(), None)
+    if connection is not None:
+        connection.close()
+
+
+@contextmanager
+def transaction() -> Iterator[dataset.Database]:
+    """Borrow a pooled connection for one unit of work.
+
+    Commits when the block exits cleanly and rolls back if it raises.
+    A nested call on the same thread joins the outer transaction, so helpers
+    such as `Bank` can be used inside a bigger piece of work.
+    This blocks the calling thread, cogs should go through `run()` instead.
+
+    Example:
+        >with database.transaction() as db:
+        >    db["mod_notes"].insert(dict(user_id=1, note="hello"))
+    """
+    db = connect()
+    if db.in_transaction:
+        yield db
+        return
+
+    try:
+        with db:
+            yield db
+    finally:
+        _release(db)
+
+
+def _execute(func: Callable[..., T], queued_at: float, args: tuple) -> T:
+    """Worker side of `run()`, executes one job inside its own transaction."""
+    stats.record_job(time.perf_counter() - queued_at)
+    with transaction() as db:
+        return func(db, *args)
+
+
+async def run(func: Callable[..., T], *args: Any) -> T:
+    """Run `func(db, *args)` on a database thread and await its result.
+
+    The whole call is one transaction, so `func` should do all of its reads and
+    writes and return plain data, never a lazy result set.
+    No more than `POOL_SIZE + QUEUE_SIZE` jobs are admitted at once, extra callers
+    wait here without blocking the event loop.
+
+    Example:
+        >def count_notes(db, user_id):
+        >    return db["mod_notes"].count(user_id=user_id)
+
+        >notes = await database.run(count_notes, member.id)
+    """
+    global _slots
+    connect()
+    if _slots is None:
+        _slots = asyncio.Semaphore(POOL_SIZE + QUEUE_SIZE)
+
+    async with _slots:
+        stats.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                _executor, _execute, func, time.perf_counter(), args
+            )
+        finally:
+            stats.in_flight -= 1
+
+
+async def query(statement: str, **params: Any) -> List[dict]:
+    """Run a statement off the event loop and return every row it produced."""
+    return await run(lambda db: list(db.query(statement, **params)))
+
+
+async def insert(table: str, row: dict) -> int:
+    """Insert one row off the event loop and return its id."""
+    return await run(lambda db: db[table].insert(row))
+
+
+def pool_status() -> dict:
+    """Snapshot of the pool's size, occupancy and checkout and queue timings."""
+    pool = connect().engine.pool
+    return dict(
+        size=pool.size(),
+        checked_out=pool.checkedout(),
+        overflow=pool.overflow(),
+        checkouts=stats.checkouts,
+        timeouts=stats.timeouts,
+        wait_avg=stats.wait_total / stats.checkouts if stats.checkouts else 0.0,
+        wait_max=stats.wait_max,
+        jobs=stats.jobs,
+        in_flight=stats.in_flight,
+        queue_avg=stats.queue_total / stats.jobs if stats.jobs else 0.0,
+        queue_max=stats.queue_max,
+    )
+
+
 def setup_db():
     """Sets up the tables needed for Raphael."""
     log.info("Setting up database and tables.")
-    with dataset.connect(get_db()) as db:
+    with transaction() as db:
         # Create mod_logs table and columns to store moderator actions.
         mod_logs = db.create_table("mod_logs")
         mod_logs.create_column("user_id", db.types.bigint)
@@ -39,7 +252,7 @@ def setup_db():
         remind_me = db.create_table("remind_me")
         remind_me.create_column("reminder_location", db.types.bigint)
         remind_me.create_column("author_id", db.types.bigint)
-        remind_me.create_column("date_to_remind", db.types.text)
+        remind_me.create_column("date_to_remind", DateTime(timezone=True))
         remind_me.create_column("message", db.types.text)
         remind_me.create_column("sent", db.types.boolean, default=False)
 
@@ -59,6 +272,25 @@ def setup_db():
         stonks.create_column("reason", db.types.text, default="")
         stonks.create_column("timestamp", db.types.datetime)
 
-        db.commit()
-        db.close()
+        # Create balances table holding each user's current balance, kept in step with bank.
+        new_balances = "balances" not in db
+        balances = db.create_table(
+            "balances",
+            primary_id="author_id",
+            primary_type=db.types.bigint,
+            primary_increment=False,
+        )
+        balances.create_column("balance", db.types.float)
+        balances.create_column("timestamp", db.types.datetime)
+        if new_balances:
+            # Seed it from the newest ledger row of every user already in the bank.
+            db.query(
+                """
+                INSERT INTO balances (author_id, balance, timestamp)
+                SELECT DISTINCT ON (author_id)
+                    author_id, opening_balance + transaction_amount, timestamp
+                FROM bank
+                ORDER BY author_id, id DESC
+                """
+            )
     log.info("Created tables and columns.")
@@ -0,0 +1,58 @@
+import re
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import parsedatetime.parsedatetime as pdt
+
+# Shared by every caller, building a Calendar loads its locale tables each time.
+CALENDAR = pdt.Calendar()
+
+# Units with a fixed length, months and years depend on the date they count from.
+# Spellings come from the Calendar's locale, so the fast path accepts what it does.
+_FIXED_UNITS = dict(seconds=1, minutes=60, hours=60 * 60, days=24 * 60 * 60)
+_FIXED_UNITS["weeks"] = 7 * _FIXED_UNITS["days"]
+_UNIT_SECONDS = {
+    spelling: _FIXED_UNITS[unit]
+    for unit, spellings in CALENDAR.ptc.units.items()
+    if unit in _FIXED_UNITS
+    for spelling in spellings
+}
+# Such as "2 hours", "30 mins" or "1d". Capped so the date can't overflow.
+_RELATIVE = re.compile(
+    rf"\s*(\d{{1,5}})\s*({'|'.join(sorted(_UNIT_SECONDS, key=len, reverse=True))})\s*",
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=1024)
+def relative_offset(phrase: str) -> Optional[Tuple[timedelta, int]]:
+    """How far ahead a simple relative phrase points and the Calendar's parse flag for it.
+
+    None when it isn't a number followed by one fixed length unit.
+    """
+    match = _RELATIVE.fullmatch(phrase)
+    if match is None:
+        return None
+    unit = _UNIT_SECONDS[match.group(2).lower()]
+    # The Calendar flags days and weeks as a date, anything shorter as a time.
+    flag = 1 if unit >= _FIXED_UNITS["days"] else 2
+    return timedelta(seconds=int(match.group(1)) * unit), flag
+
+
+def parse(text: str, source: datetime) -> Tuple[time.struct_time, int]:
+    """Parse a natural language date or time relative to `source`, like `Calendar.parse`.
+
+    Returns the parsed time and a flag, 0 if the text wasn't understood,
+    1 for a date and 2 for a time. Common phrases such as "1 day" skip the Calendar.
+
+    Example:
+        >when, flag = dateparse.parse("2 hours", ctx.message.created_at)
+    """
+    offset = relative_offset(text)
+    if offset is None:
+        return CALENDAR.parse(text, source)
+
+    delta, flag = offset
+    return (source.replace(microsecond=0) + delta).timetuple(), flag
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+import aiohttp
+
+import constants
+
+log = logging.getLogger(__name__)
+
+FINNHUB_URL = constants.Finnhub.url
+FINNHUB_TOKEN = constants.Finnhub.token
+
+# Request behaviour, see `finnhub` in config-default.yml.
+TIMEOUT = constants.Finnhub.timeout
+RETRIES = constants.Finnhub.retries
+BACKOFF = constants.Finnhub.backoff
+# Finnhub's quota, requests allowed per minute and in one burst.
+RATE_LIMIT = constants.Finnhub.rate_limit
+BURST = constants.Finnhub.burst
+
+# Status codes worth another try, everything else is the request's fault.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FinnhubError(Exception):
+    """Raised when Finnhub can't answer a request, even after retrying."""
+
+
+class TokenBucket:
+    """Rate limiter allowing `rate` calls per `per` seconds, in bursts of up to `capacity`.
+
+    Callers wait their turn in the order they arrived.
+    """
+
+    def __init__(self, rate: float, per: float = 60.0, capacity: Optional[int] = None):
+        self.fill_rate = rate / per
+        self.capacity = capacity or rate
+        self.tokens = float(self.capacity)
+        self.updated: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self) -> None:
+        """Wait until a call is allowed and take its token."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self.updated is not None:
+                    self.tokens = min(
+                        self.capacity,
+                        self.tokens + (now - self.updated) * self.fill_rate,
+                    )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.fill_rate)
+
+
+class Finnhub:
+    """Async client for the Finnhub REST API.
+
+    Every request goes through one keep-alive session, so repeated calls reuse
+    the same TLS connections instead of opening one each.
+    Timeouts, connection errors, 429s and 5xxs are retried with exponential backoff.
+    Requests share a token bucket sized to Finnhub's quota, so bursts wait instead of failing.
+    Point `base_url` at a local server to run it against canned responses.
+
+    Example:
+        >finnhub = Finnhub()
+        >quote = await finnhub.quote("AAPL")
+        >await finnhub.close()
+    """
+
+    def __init__(
+        self,
+        token: str = FINNHUB_TOKEN,
+        base_url: str = FINNHUB_URL,
+        timeout: float = TIMEOUT,
+        retries: int = RETRIES,
+        backoff: float = BACKOFF,
+        rate_limit: int = RATE_LIMIT,
+        burst: int = BURST,
+    ):
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.bucket = TokenBucket(rate_limit, 60.0, burst)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Created on first use, a session has to be made inside the running event loop.
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=10, keepalive_timeout=60),
+                timeout=self.timeout,
+                raise_for_status=False,
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Close the session and its pooled connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get(self, path: str, **params: Any) -> Any:
+        """GET an API path and return its decoded JSON body."""
+        url = f"{self.base_url}/api/v1/{path}"
+        params["token"] = self.token
+
+        for attempt in range(self.retries + 1):
+            delay = self.backoff * 2**attempt
+            await self.bucket.acquire()
+            try:
+                async with self.session.get(url, params=params) as response:
+                    if response.status in RETRY_STATUSES and attempt < self.retries:
+                        # Finnhub says how long to wait when we're over quota.
+                        retry_after = response.headers.get("Retry-After", "")
+                        if retry_after.isdigit():
+                            delay = max(delay, int(retry_after))
+                        log.warning(
+                            f"Finnhub {path} returned {response.status}, retrying in {delay:.1f}s."
+                        )
+                        await asyncio.sleep(delay)
+                        continue
+                    if response.status != 200:
+                        raise FinnhubError(
+                            f"Finnhub {path} returned {response.status}: {await response.text()}"
+                        )
+                    try:
+                        data = await response.json(content_type=None)
+                    except ValueError as e:
+                        raise FinnhubError(
+                            f"Finnhub {path} returned a body that isn't JSON: {e}"
+                        ) from e
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    raise FinnhubError(
+                        f"Finnhub {path} failed after {attempt + 1} tries: {e!r}"
+                    ) from e
+                log.warning(
+                    f"Finnhub {path} failed with {e!r}, retrying in {delay:.1f}s."
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            if isinstance(data, dict) and "error" in data:
+                raise FinnhubError(data["error"])
+            return data
+
+    async def quote(self, symbol: str) -> dict:
+        """Current price of a symbol, `t` is 0 when Finnhub doesn't know it.
+
+        https://finnhub.io/docs/api/quote
+        """
+        return await self.get("quote", symbol=symbol)
+
+    async def quotes(self, symbols: Iterable[str]) -> Dict[str, dict]:
+        """Quotes for many symbols at once, fetched concurrently within the rate limit.
+
+        Repeated symbols are fetched once. Symbols that failed are logged and left out
+        of the result, so one bad ticker doesn't sink the rest.
+        The rate limit still applies: with the default 60 a minute in bursts of 30,
+        the first 30 go out at once and each one after waits a second, so 50 take about 20s.
+        """
+        unique = list(dict.fromkeys(symbols))
+        results = await asyncio.gather(
+            *(self.quote(symbol) for symbol in unique), return_exceptions=True
+        )
+
+        quotes = {}
+        for symbol, result in zip(unique, results):
+            if isinstance(result, FinnhubError):
+                log.error(f"Quote for {symbol} failed: {result}")
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                quotes[symbol] = result
+        return quotes
+
+    async def search(self, query: str) -> dict:
+        """Best matching symbols for a query.
+
+        https://finnhub.io/docs/api/symbol-search
+        """
+        return await self.get("search", q=query)
+
+    async def stock_symbols(self, mic: str) -> list:
+        """Every US symbol listed on the exchange identified by its market identifier code.
+
+        https://finnhub.io/docs/api/stock-symbols
+        """
+        return await self.get("stock/symbol", exchange="US", mic=mic)
+
+    async def crypto_symbols(self, exchange: str) -> list:
+        """Every symbol traded on a crypto exchange.
+
+        https://finnhub.io/docs/api/crypto-symbols
+        """
+        return await self.get("crypto/symbol", exchange=exchange)
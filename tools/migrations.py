@@ -0,0 +1,241 @@
+import logging
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional, Union
+
+import dataset
+from sqlalchemy import text
+
+from tools import database, positions
+
+log = logging.getLogger(__name__)
+
+# Arbitrary key for the Postgres advisory lock that stops two bots migrating at once.
+LOCK_KEY = 7_212_004
+
+
+class Index(NamedTuple):
+    """An index built with CREATE INDEX CONCURRENTLY, so writes to the table carry on meanwhile."""
+
+    name: str
+    table: str
+    columns: str
+    where: Optional[str] = None
+
+    def create(self) -> str:
+        statement = (
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.name} "
+            f"ON {self.table} ({self.columns})"
+        )
+        if self.where:
+            statement += f" WHERE {self.where}"
+        return statement
+
+
+# A step is a statement or a function of the database, both run in a transaction,
+# or an Index, which Postgres refuses to build concurrently inside one.
+Step = Union[str, Callable[[dataset.Database], None], Index]
+
+
+class Migration(NamedTuple):
+    """One schema change, applied once and recorded in `schema_version`.
+
+    Steps may run again if the bot dies half way through, so they must be idempotent.
+    """
+
+    version: int
+    description: str
+    steps: List[Step]
+
+
+# Append new migrations to the end with the next version number, never edit applied ones.
+MIGRATIONS = [
+    Migration(
+        1,
+        "Index the columns our hot queries filter on",
+        [
+            Index("bank_author_id_idx", "bank", "author_id, id DESC"),
+            Index("stonks_author_id_stonk_idx", "stonks", "author_id, stonk"),
+            Index(
+                "remind_me_unsent_date_idx",
+                "remind_me",
+                "date_to_remind",
+                where="sent = FALSE",
+            ),
+            Index(
+                "remind_me_unsent_author_id_idx",
+                "remind_me",
+                "author_id",
+                where="sent = FALSE",
+            ),
+            Index("mod_logs_user_id_idx", "mod_logs", "user_id"),
+            Index("mod_notes_user_id_idx", "mod_notes", "user_id"),
+        ],
+    ),
+    Migration(
+        2,
+        "Keep every user's stock positions in a table of their own",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS positions (
+                author_id BIGINT NOT NULL,
+                stonk TEXT NOT NULL,
+                quantity BIGINT NOT NULL,
+                cost_basis DOUBLE PRECISION NOT NULL,
+                timestamp TIMESTAMP,
+                PRIMARY KEY (author_id, stonk)
+            )
+            """,
+            positions.backfill,
+        ],
+    ),
+    Migration(
+        3,
+        "Keep the latest price of every held stock",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS price_snapshots (
+                stonk TEXT PRIMARY KEY,
+                price DOUBLE PRECISION NOT NULL,
+                timestamp TIMESTAMP NOT NULL
+            )
+            """,
+        ],
+    ),
+    Migration(
+        4,
+        "Store reminder times as timestamps instead of text",
+        [
+            # Text times were written in UTC as YYYY-MM-DD HH:MM:SS. The partial index
+            # on unsent reminders from migration 1 is rebuilt on the new type.
+            """
+            DO $$
+            BEGIN
+                IF (
+                    SELECT data_type FROM information_schema.columns
+                    WHERE table_name = 'remind_me' AND column_name = 'date_to_remind'
+                ) = 'text' THEN
+                    ALTER TABLE remind_me
+                    ALTER COLUMN date_to_remind TYPE TIMESTAMPTZ
+                    USING CAST(NULLIF(date_to_remind, '') AS TIMESTAMP) AT TIME ZONE 'UTC';
+                END IF;
+            END
+            $$
+            """,
+            Index(
+                "remind_me_unsent_date_idx",
+                "remind_me",
+                "date_to_remind",
+                where="sent = FALSE",
+            ),
+        ],
+    ),
+    Migration(
+        5,
+        "Let reminders repeat at an interval",
+        [
+            "ALTER TABLE remind_me ADD COLUMN IF NOT EXISTS repeat_every INTERVAL",
+        ],
+    ),
+    Migration(
+        6,
+        "Store the seed of the game a ledger entry pays for and its hash",
+        [
+            """
+            ALTER TABLE bank
+            ADD COLUMN IF NOT EXISTS seed TEXT,
+            ADD COLUMN IF NOT EXISTS seed_hash TEXT
+            """,
+        ],
+    ),
+    Migration(
+        7,
+        "Retire reminders left without a time by migration 4",
+        [
+            # Empty text times became NULL, such a reminder can never come due.
+            """
+            UPDATE remind_me
+            SET sent = TRUE
+            WHERE date_to_remind IS NULL AND sent = FALSE
+            """,
+        ],
+    ),
+]
+
+
+def _build_index(connection, index: Index) -> None:
+    """Build an index outside of any transaction, replacing one left invalid by a failed build."""
+    statement = """
+        SELECT pg_index.indisvalid
+        FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+        WHERE pg_class.relname = :name
+        """
+    valid = connection.execute(text(statement), name=index.name).scalar()
+    if valid is False:
+        log.warning(f"Dropping invalid index {index.name} left by an earlier build.")
+        connection.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}")
+    connection.execute(index.create())
+
+
+def _apply(connection, migration: Migration) -> None:
+    """Run every step of a migration, then record its version."""
+    for step in migration.steps:
+        if isinstance(step, Index):
+            _build_index(connection, step)
+            continue
+
+        with database.transaction() as db:
+            if callable(step):
+                step(db)
+            else:
+                db.query(step)
+
+    with database.transaction() as db:
+        db["schema_version"].insert(
+            dict(
+                version=migration.version,
+                description=migration.description,
+                applied_at=datetime.now(),
+            )
+        )
+
+
+def migrate() -> None:
+    """Apply every migration newer than the database's schema version, run at startup after `setup_db`."""
+    with database.transaction() as db:
+        schema_version = db.create_table(
+            "schema_version",
+            primary_id="version",
+            primary_type=db.types.integer,
+            primary_increment=False,
+        )
+        schema_version.create_column("description", db.types.text)
+        schema_version.create_column("applied_at", db.types.datetime)
+
+    # Concurrent index builds need a connection in autocommit mode.
+    connection = (
+        database.connect()
+        .engine.connect()
+        .execution_options(isolation_level="AUTOCOMMIT")
+    )
+    try:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), key=LOCK_KEY)
+        applied = {
+            row["version"]
+            for row in connection.execute("SELECT version FROM schema_version")
+        }
+        pending = [m for m in MIGRATIONS if m.version not in applied]
+        if not pending:
+            log.info(
+                f"Database schema is up to date, version {max(applied, default=0)}."
+            )
+            return
+
+        for migration in pending:
+            log.info(
+                f"Applying database migration {migration.version}: {migration.description}"
+            )
+            _apply(connection, migration)
+        log.info(f"Database schema migrated to version {pending[-1].version}.")
+    finally:
+        connection.execute(text("SELECT pg_advisory_unlock(:key)"), key=LOCK_KEY)
+        connection.close()
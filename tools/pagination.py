@@ -7,6 +7,7 @@ from discord.abc import User
 from discord.ext.commands import Context, Paginator
 
 import constants
+from tools.sessions import sessions
 
 FIRST_EMOJI = constants.Emojis.first
 LEFT_EMOJI = constants.Emojis.previous
@@ -221,7 +222,9 @@ class LinePaginator(Paginator):
         >await LinePaginator.paginate([line for line in lines], ctx, embed)
         """
 
-        def event_check(reaction_: discord.Reaction, user_: discord.Member) -> bool:
+        def event_check(
+            reaction_: discord.RawReactionActionEvent, user_: discord.Member
+        ) -> bool:
             """Make sure that this reaction is what we want to operate on."""
             no_restrictions = (
                 # Pagination is not restricted
@@ -234,8 +237,6 @@ class LinePaginator(Paginator):
                 # Conditions for a successful pagination:
                 all(
                     (
-                        # Reaction is on this message
-                        reaction_.message.id == message.id,
                         # Reaction is one of the pagination emotes
                         str(reaction_.emoji) in PAGINATION_EMOJI,
                         # Reaction was not made by the Bot
@@ -315,111 +316,110 @@ class LinePaginator(Paginator):
             log.trace(f"Adding reaction: {repr(emoji)}")
             await message.add_reaction(emoji)
 
-        while True:
-            try:
-                reaction, user = await ctx.bot.wait_for(
-                    "reaction_add", timeout=timeout, check=event_check
-                )
-                log.trace(f"Got reaction: {reaction}")
-            except asyncio.TimeoutError:
-                log.debug("Timed out waiting for a reaction")
-                break  # We're done, no reactions for the last 5 minutes
-
-            if str(reaction.emoji) == DELETE_EMOJI:
-                log.debug("Got delete reaction")
-                return await message.delete()
+        with sessions.open(message, event_check) as session:
+            while True:
+                try:
+                    reaction, user = await session.wait(timeout=timeout)
+                    log.trace(f"Got reaction: {reaction}")
+                except asyncio.TimeoutError:
+                    log.debug("Timed out waiting for a reaction")
+                    break  # We're done, no reactions for the last 5 minutes
 
-            if str(reaction.emoji) == FIRST_EMOJI:
-                await message.remove_reaction(reaction.emoji, user)
-                current_page = 0
+                if str(reaction.emoji) == DELETE_EMOJI:
+                    log.debug("Got delete reaction")
+                    return await message.delete()
 
-                log.debug(
-                    f"Got first page reaction - changing to page 1/{len(paginator.pages)}"
-                )
+                if str(reaction.emoji) == FIRST_EMOJI:
+                    await message.remove_reaction(reaction.emoji, user)
+                    current_page = 0
 
-                embed.description = paginator.pages[current_page]
-                if footer_text:
-                    embed.set_footer(
-                        text=f"{footer_text} (Page {current_page + 1}/{len(paginator.pages)})"
-                    )
-                else:
-                    embed.set_footer(
-                        text=f"Page {current_page + 1}/{len(paginator.pages)}"
+                    log.debug(
+                        f"Got first page reaction - changing to page 1/{len(paginator.pages)}"
                     )
-                await message.edit(embed=embed)
-
-            if str(reaction.emoji) == LAST_EMOJI:
-                await message.remove_reaction(reaction.emoji, user)
-                current_page = len(paginator.pages) - 1
 
-                log.debug(
-                    f"Got last page reaction - changing to page {current_page + 1}/{len(paginator.pages)}"
-                )
+                    embed.description = paginator.pages[current_page]
+                    if footer_text:
+                        embed.set_footer(
+                            text=f"{footer_text} (Page {current_page + 1}/{len(paginator.pages)})"
+                        )
+                    else:
+                        embed.set_footer(
+                            text=f"Page {current_page + 1}/{len(paginator.pages)}"
+                        )
+                    await message.edit(embed=embed)
+
+                if str(reaction.emoji) == LAST_EMOJI:
+                    await message.remove_reaction(reaction.emoji, user)
+                    current_page = len(paginator.pages) - 1
 
-                embed.description = paginator.pages[current_page]
-                if footer_text:
-                    embed.set_footer(
-                        text=f"{footer_text} (Page {current_page + 1}/{len(paginator.pages)})"
-                    )
-                else:
-                    embed.set_footer(
-                        text=f"Page {current_page + 1}/{len(paginator.pages)}"
+                    log.debug(
+                        f"Got last page reaction - changing to page {current_page + 1}/{len(paginator.pages)}"
                     )
-                await message.edit(embed=embed)
-
-            if str(reaction.emoji) == LEFT_EMOJI:
-                await message.remove_reaction(reaction.emoji, user)
 
-                if current_page <= 0:
+                    embed.description = paginator.pages[current_page]
+                    if footer_text:
+                        embed.set_footer(
+                            text=f"{footer_text} (Page {current_page + 1}/{len(paginator.pages)})"
+                        )
+                    else:
+                        embed.set_footer(
+                            text=f"Page {current_page + 1}/{len(paginator.pages)}"
+                        )
+                    await message.edit(embed=embed)
+
+                if str(reaction.emoji) == LEFT_EMOJI:
+                    await message.remove_reaction(reaction.emoji, user)
+
+                    if current_page <= 0:
+                        log.debug(
+                            "Got previous page reaction, but we're on the first page - ignoring"
+                        )
+                        continue
+
+                    current_page -= 1
                     log.debug(
-                        "Got previous page reaction, but we're on the first page - ignoring"
+                        f"Got previous page reaction - changing to page {current_page + 1}/{len(paginator.pages)}"
                     )
-                    continue
 
-                current_page -= 1
-                log.debug(
-                    f"Got previous page reaction - changing to page {current_page + 1}/{len(paginator.pages)}"
-                )
+                    embed.description = paginator.pages[current_page]
 
-                embed.description = paginator.pages[current_page]
+                    if footer_text:
+                        embed.set_footer(
+                            text=f"{footer_text} (Page {current_page + 1}/{len(paginator.pages)})"
+                        )
+                    else:
+                        embed.set_footer(
+                            text=f"Page {current_page + 1}/{len(paginator.pages)}"
+                        )
 
-                if footer_text:
-                    embed.set_footer(
-                        text=f"{footer_text} (Page {current_page + 1}/{len(paginator.pages)})"
-                    )
-                else:
-                    embed.set_footer(
-                        text=f"Page {current_page + 1}/{len(paginator.pages)}"
-                    )
+                    await message.edit(embed=embed)
 
-                await message.edit(embed=embed)
+                if str(reaction.emoji) == RIGHT_EMOJI:
+                    await message.remove_reaction(reaction.emoji, user)
 
-            if str(reaction.emoji) == RIGHT_EMOJI:
-                await message.remove_reaction(reaction.emoji, user)
+                    if current_page >= len(paginator.pages) - 1:
+                        log.debug(
+                            "Got next page reaction, but we're on the last page - ignoring"
+                        )
+                        continue
 
-                if current_page >= len(paginator.pages) - 1:
+                    current_page += 1
                     log.debug(
-                        "Got next page reaction, but we're on the last page - ignoring"
+                        f"Got next page reaction - changing to page {current_page + 1}/{len(paginator.pages)}"
                     )
-                    continue
 
-                current_page += 1
-                log.debug(
-                    f"Got next page reaction - changing to page {current_page + 1}/{len(paginator.pages)}"
-                )
-
-                embed.description = paginator.pages[current_page]
+                    embed.description = paginator.pages[current_page]
 
-                if footer_text:
-                    embed.set_footer(
-                        text=f"{footer_text} (Page {current_page + 1}/{len(paginator.pages)})"
-                    )
-                else:
-                    embed.set_footer(
-                        text=f"Page {current_page + 1}/{len(paginator.pages)}"
-                    )
+                    if footer_text:
+                        embed.set_footer(
+                            text=f"{footer_text} (Page {current_page + 1}/{len(paginator.pages)})"
+                        )
+                    else:
+                        embed.set_footer(
+                            text=f"Page {current_page + 1}/{len(paginator.pages)}"
+                        )
 
-                await message.edit(embed=embed)
+                    await message.edit(embed=embed)
 
         log.debug("Ending pagination and clearing reactions.")
         try:
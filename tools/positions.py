@@ -0,0 +1,227 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import dataset
+
+from tools import database
+
+log = logging.getLogger(__name__)
+
+
+class InsufficientShares(Exception):
+    """Raised when a sale is for more shares than the seller holds, nothing is recorded."""
+
+    def __init__(self, author_id: int, stonk: str, owned: int, amount: int):
+        self.author_id = author_id
+        self.stonk = stonk
+        self.owned = owned
+        self.amount = amount
+        super().__init__(
+            f"{author_id} cannot sell {amount:,} shares of {stonk} holding {owned:,}"
+        )
+
+
+def record_buy(
+    db: dataset.Database,
+    author_id: int,
+    stonk: str,
+    amount: int,
+    cost: float,
+    timestamp: datetime,
+) -> None:
+    """Database job: log a purchase and add the shares and their cost to the buyer's position."""
+    db["stonks"].insert(
+        dict(
+            author_id=author_id,
+            stonk=stonk,
+            amount=amount,
+            investment_cost=-cost,
+            timestamp=timestamp,
+        )
+    )
+    statement = """
+        INSERT INTO positions (author_id, stonk, quantity, cost_basis, timestamp)
+        VALUES (:author_id, :stonk, :amount, :cost, :timestamp)
+        ON CONFLICT (author_id, stonk) DO UPDATE
+        SET quantity = positions.quantity + EXCLUDED.quantity,
+            cost_basis = positions.cost_basis + EXCLUDED.cost_basis,
+            timestamp = EXCLUDED.timestamp
+        """
+    db.query(
+        statement,
+        author_id=author_id,
+        stonk=stonk,
+        amount=amount,
+        cost=cost,
+        timestamp=timestamp,
+    )
+
+
+def record_sell(
+    db: dataset.Database,
+    author_id: int,
+    stonk: str,
+    amount: int,
+    proceeds: float,
+    timestamp: datetime,
+) -> None:
+    """Database job: log a sale and take the shares out of the seller's position.
+
+    The cost basis shrinks in proportion to the shares sold, so it stays the average
+    cost of the shares still held. Raises InsufficientShares if the seller doesn't hold
+    `amount` shares, rolling back the whole transaction.
+    """
+    if amount <= 0:
+        raise ValueError("Can only sell a positive number of shares")
+
+    # Every SET expression sees the row as it was before the update.
+    statement = """
+        UPDATE positions
+        SET quantity = quantity - :amount,
+            cost_basis = cost_basis * (quantity - :amount) / quantity,
+            timestamp = :timestamp
+        WHERE author_id = :author_id AND stonk = :stonk AND quantity >= :amount
+        RETURNING quantity
+        """
+    rows = list(
+        db.query(
+            statement,
+            author_id=author_id,
+            stonk=stonk,
+            amount=amount,
+            timestamp=timestamp,
+        )
+    )
+    if not rows:
+        raise InsufficientShares(author_id, stonk, _owned(db, author_id, stonk), amount)
+    if rows[0]["quantity"] == 0:
+        db["positions"].delete(author_id=author_id, stonk=stonk)
+
+    db["stonks"].insert(
+        dict(
+            author_id=author_id,
+            stonk=stonk,
+            amount=-amount,
+            investment_cost=proceeds,
+            timestamp=timestamp,
+        )
+    )
+
+
+def _owned(db: dataset.Database, author_id: int, stonk: str) -> int:
+    """Database job: shares of a stock held by a user."""
+    row = db["positions"].find_one(author_id=author_id, stonk=stonk)
+    return row["quantity"] if row else 0
+
+
+def backfill(db: dataset.Database) -> None:
+    """Database job: rebuild every position by replaying the trade log, oldest trade first."""
+    positions = {}
+    for trade in db.query(
+        "SELECT author_id, stonk, amount, investment_cost FROM stonks ORDER BY id"
+    ):
+        key = (trade["author_id"], trade["stonk"])
+        quantity, cost_basis = positions.get(key, (0, 0.0))
+        if trade["amount"] > 0:
+            # Purchases are logged with a negative investment cost.
+            cost_basis -= trade["investment_cost"]
+        elif quantity > 0:
+            cost_basis *= (quantity + trade["amount"]) / quantity
+        positions[key] = (quantity + trade["amount"], cost_basis)
+
+    timestamp = datetime.now()
+    rows = [
+        dict(
+            author_id=author_id,
+            stonk=stonk,
+            quantity=quantity,
+            cost_basis=cost_basis,
+            timestamp=timestamp,
+        )
+        for (author_id, stonk), (quantity, cost_basis) in positions.items()
+        if quantity > 0
+    ]
+    db.query("DELETE FROM positions")
+    db["positions"].insert_many(rows)
+    log.info(f"Rebuilt {len(rows):,} stock positions from the trade log.")
+
+
+async def owned(author_id: int, stonk: str) -> int:
+    """Shares of a stock held by a user."""
+    return await database.run(_owned, author_id, stonk)
+
+
+async def holdings(author_id: int) -> List[dict]:
+    """Every stock a user holds with its quantity and cost basis, by symbol."""
+    statement = """
+        SELECT stonk, quantity, cost_basis
+        FROM positions
+        WHERE author_id = :author_id
+        ORDER BY stonk"""
+    return await database.query(statement, author_id=author_id)
+
+
+async def market() -> List[dict]:
+    """Every stock held by anyone with the total quantity held, by symbol."""
+    statement = """
+        SELECT stonk, SUM(quantity)::BIGINT AS quantity
+        FROM positions
+        GROUP BY stonk
+        ORDER BY stonk"""
+    return await database.query(statement)
+
+
+def record_prices(
+    db: dataset.Database, prices: Dict[str, float], timestamp: datetime
+) -> None:
+    """Database job: save the latest price of each stock, in coins per share, for `net_worths()`."""
+    params = dict(timestamp=timestamp)
+    values = []
+    for i, (stonk, price) in enumerate(prices.items()):
+        values.append(f"(CAST(:stonk_{i} AS TEXT), CAST(:price_{i} AS FLOAT))")
+        params.update({f"stonk_{i}": stonk, f"price_{i}": price})
+
+    statement = f"""
+        INSERT INTO price_snapshots AS snapshot (stonk, price, timestamp)
+        SELECT stonk, price, :timestamp
+        FROM (VALUES {", ".join(values)}) AS prices (stonk, price)
+        ORDER BY stonk
+        ON CONFLICT (stonk) DO UPDATE
+        SET price = EXCLUDED.price, timestamp = EXCLUDED.timestamp
+        """
+    db.query(statement, **params)
+
+
+def prune_prices(db: dataset.Database) -> None:
+    """Database job: drop the prices of stocks nobody holds any more."""
+    db.query(
+        """
+        DELETE FROM price_snapshots
+        WHERE stonk NOT IN (SELECT stonk FROM positions)
+        """
+    )
+
+
+async def net_worths(limit: int = 10, author_id: Optional[int] = None) -> List[dict]:
+    """Users by net worth, their balance plus their stocks at the last snapshot's prices.
+
+    Stocks without a snapshot yet count for nothing. `snapshot` is when the oldest
+    price used was taken. Pass `author_id` for one user's row.
+    """
+    statement = """
+        SELECT
+            balances.author_id,
+            balances.balance,
+            COALESCE(SUM(positions.quantity * price_snapshots.price), 0) AS stocks,
+            balances.balance
+                + COALESCE(SUM(positions.quantity * price_snapshots.price), 0) AS net_worth,
+            MIN(price_snapshots.timestamp) AS snapshot
+        FROM balances
+        LEFT JOIN positions ON positions.author_id = balances.author_id
+        LEFT JOIN price_snapshots ON price_snapshots.stonk = positions.stonk
+        WHERE CAST(:author_id AS BIGINT) IS NULL OR balances.author_id = :author_id
+        GROUP BY balances.author_id, balances.balance
+        ORDER BY net_worth DESC
+        LIMIT :limit"""
+    return await database.query(statement, author_id=author_id, limit=limit)
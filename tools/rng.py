@@ -0,0 +1,56 @@
+import hashlib
+import hmac
+import random
+import secrets
+from typing import List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+def commit(seed: str) -> str:
+    """The hash of a seed shown before a game, it proves the seed wasn't changed after."""
+    return hashlib.sha256(seed.encode()).hexdigest()
+
+
+def verify(seed: str, seed_hash: str) -> bool:
+    """Whether a revealed seed is the one committed to by `seed_hash`."""
+    return hmac.compare_digest(commit(seed), seed_hash)
+
+
+class GameRNG(random.Random):
+    """A game's random numbers, drawn from a secret seed committed to before play.
+
+    Show `seed_hash` when the game starts and `server_seed` once it's over, anyone can
+    then check the hash and replay every draw with `GameRNG(game, server_seed)`.
+    The game's name is mixed into the stream, so one seed draws differently per game.
+    The seed and its hash are stored with the game's ledger entry, see `Bank.transfer`.
+
+    Example:
+        >rng = GameRNG("slots")
+        >await Bank.transfer(ctx.author, None, bet, "Slot Machine", seed=rng.server_seed)
+        >frames = rng.draw(symbols, cum_weights, k=3)
+    """
+
+    def __init__(self, game: str, seed: Optional[str] = None):
+        self.game = game
+        self.server_seed = secrets.token_hex(32) if seed is None else seed
+        self.seed_hash = commit(self.server_seed)
+        stream = hashlib.sha256(f"{game}:{self.server_seed}".encode()).digest()
+        super().__init__(int.from_bytes(stream, "big"))
+
+    def draw(
+        self,
+        population: Sequence[T],
+        cum_weights: Optional[Sequence[float]] = None,
+        k: int = 1,
+    ) -> List[T]:
+        """Draw `k` items at once, weighted by `cum_weights` or evenly without them."""
+        if cum_weights is None:
+            return [population[i] for i in self.integers(0, len(population), k)]
+        return self.choices(population, cum_weights=cum_weights, k=k)
+
+    def integers(self, low: int, high: int, k: int = 1) -> List[int]:
+        """Draw `k` integers from `low` up to but not including `high`."""
+        if high <= low:
+            raise ValueError(f"Empty range for integers({low}, {high})")
+        return [self.randrange(low, high) for _ in range(k)]
@@ -0,0 +1,168 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import discord
+
+log = logging.getLogger(__name__)
+
+User = Union[discord.User, discord.Member]
+# Decides whether a reaction is meant for the session, given the reaction and who added it.
+Check = Callable[[discord.RawReactionActionEvent, User], bool]
+
+
+class ReactionSession:
+    """The reactions added to one message, such as a game or a paginated embed.
+
+    Opened with `sessions.open()`, reactions on the message are handed to whoever is
+    waiting in `wait()`, much like `bot.wait_for("reaction_add")` but without a check
+    run for every reaction in every guild. Reactions added while nobody waits are
+    dropped, as they were with `wait_for`.
+
+    Example:
+        >with sessions.open(message, check) as session:
+        >    reaction, user = await session.wait(timeout=60)
+        >    await message.remove_reaction(reaction.emoji, user)
+    """
+
+    def __init__(
+        self, manager: "SessionManager", message_id: int, check: Optional[Check]
+    ):
+        self.manager = manager
+        self.message_id = message_id
+        self.check = check
+        self.waiter: Optional[asyncio.Future] = None
+        # Event loop time `wait()` gives up at, None while nobody waits.
+        self.deadline: Optional[float] = None
+
+    def __enter__(self) -> "ReactionSession":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.manager.close(self)
+
+    async def wait(self, timeout: float) -> Tuple[discord.RawReactionActionEvent, User]:
+        """The next reaction passing the check and who added it.
+
+        Raises asyncio.TimeoutError after `timeout` seconds without one.
+        """
+        loop = asyncio.get_running_loop()
+        self.waiter = loop.create_future()
+        self.deadline = loop.time() + timeout
+        self.manager.arm(self)
+        try:
+            return await self.waiter
+        finally:
+            self.waiter = None
+            self.deadline = None
+
+    def feed(self, payload: discord.RawReactionActionEvent, user: User) -> None:
+        """Hand a reaction on the message to the waiter, if there is one and it's wanted."""
+        if self.waiter is None or self.waiter.done():
+            return
+        if self.check is not None and not self.check(payload, user):
+            return
+        self.waiter.set_result((payload, user))
+
+    def expire(self) -> None:
+        """Time out the waiter."""
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_exception(asyncio.TimeoutError())
+
+
+class SessionManager:
+    """Every open reaction session, keyed on message id.
+
+    A reaction is routed to its message's session with one dict lookup, and every
+    session's timeout is kept in one heap served by a single timer, set for the
+    soonest. Heap entries left behind by waits that got a reaction are skipped
+    when they come up, and cleared out once they outnumber the live ones.
+    """
+
+    def __init__(self):
+        self.sessions: Dict[int, ReactionSession] = {}
+        # Deadline, tie breaker and session of every wait, soonest first.
+        self.heap: List[Tuple[float, int, ReactionSession]] = []
+        self._order = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.routed = 0
+        self.timeouts = 0
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def open(
+        self, message: discord.Message, check: Optional[Check] = None
+    ) -> ReactionSession:
+        """Start routing the reactions on `message`, close it when done or use it in a with block.
+
+        Raises ValueError if the message already has a session.
+        """
+        if message.id in self.sessions:
+            raise ValueError(f"Message {message.id} already has a reaction session")
+        session = ReactionSession(self, message.id, check)
+        self.sessions[message.id] = session
+        return session
+
+    def close(self, session: ReactionSession) -> None:
+        """Stop routing reactions to a session, its heap entries are skipped from now on."""
+        if self.sessions.get(session.message_id) is session:
+            del self.sessions[session.message_id]
+        session.expire()
+
+    def dispatch(self, payload: discord.RawReactionActionEvent, user: User) -> bool:
+        """Route a reaction to its message's session, returns whether there was one."""
+        session = self.sessions.get(payload.message_id)
+        if session is None:
+            return False
+        self.routed += 1
+        session.feed(payload, user)
+        return True
+
+    def arm(self, session: ReactionSession) -> None:
+        """Time out a session's wait at its deadline."""
+        heapq.heappush(self.heap, (session.deadline, next(self._order), session))
+        if len(self.heap) > 4 * len(self.sessions) + 64:
+            self.heap = [entry for entry in self.heap if entry[2].deadline == entry[0]]
+            heapq.heapify(self.heap)
+        if self._timer is None or session.deadline < self._timer.when():
+            self._schedule()
+
+    def _schedule(self) -> None:
+        """Set the timer for the soonest deadline in the heap."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.heap:
+            self._timer = asyncio.get_running_loop().call_at(
+                self.heap[0][0], self._expire
+            )
+
+    def _expire(self) -> None:
+        """Time out every wait past its deadline."""
+        self._timer = None
+        now = asyncio.get_running_loop().time()
+        while self.heap and self.heap[0][0] <= now:
+            deadline, _, session = heapq.heappop(self.heap)
+            # Skip entries of waits that already got a reaction or a newer deadline.
+            if session.deadline == deadline:
+                self.timeouts += 1
+                session.expire()
+        self._schedule()
+
+    def status(self) -> dict:
+        """Snapshot of the open sessions and their timers."""
+        return dict(
+            active=len(self.sessions),
+            waiting=sum(
+                session.waiter is not None for session in self.sessions.values()
+            ),
+            timers=len(self.heap),
+            routed=self.routed,
+            timeouts=self.timeouts,
+        )
+
+
+sessions = SessionManager()
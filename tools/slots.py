@@ -0,0 +1,110 @@
+import random
+from collections import Counter
+from itertools import accumulate, product
+from typing import Dict, List, Sequence, Tuple
+
+# How often each symbol comes up on each reel, out of the reel's total weight.
+REELS = [
+    dict(seven=1, bar=4, mellon=2, bell=1, peach=9, honey=9, cherry=9, lemon=5),
+    dict(seven=1, bar=2, mellon=2, bell=8, peach=3, honey=13, cherry=4, lemon=0),
+    dict(seven=1, bar=1, mellon=8, bell=8, peach=3, honey=2, cherry=0, lemon=10),
+]
+
+# Symbol, how many of it come up and what that pays per coin bet, a spin pays its best line.
+PAYTABLE = [
+    ("cherry", 1, 2),
+    ("cherry", 2, 5),
+    ("honey", 3, 10),
+    ("peach", 3, 14),
+    ("bell", 3, 18),
+    ("mellon", 3, 100),
+    ("bar", 3, 125),
+    ("seven", 3, 200),
+]
+# Two of these and a bar pay as three of them.
+BAR_PAIRS = {"honey", "peach", "bell"}
+
+Outcome = Tuple[str, ...]
+
+
+def line_pay(outcome: Outcome) -> int:
+    """What a spin showing `outcome` pays per coin bet, by `PAYTABLE`."""
+    counts = Counter(outcome)
+    for symbol in BAR_PAIRS:
+        if counts[symbol] == 2 and counts["bar"]:
+            counts[symbol] = 3
+    return max(
+        (pay for symbol, count, pay in PAYTABLE if counts[symbol] >= count),
+        default=0,
+    )
+
+
+class SlotMachine:
+    """A slot machine's reels with every outcome's payout worked out up front.
+
+    Spinning draws each reel from its cumulative weights and looks the payout up,
+    and the exact return to player comes from enumerating every outcome.
+
+    Outcomes are numbered reel by reel, like digits, so `payouts` and `probabilities`
+    can be indexed by an array of draws when simulating many spins at once.
+
+    Example:
+        >machine = SlotMachine(REELS)
+        >outcome = machine.spin()
+        >credit += machine.payout(outcome) * bet
+        >machine.rtp()  # (1.139..., 16.26...) return and variance per coin bet.
+    """
+
+    def __init__(self, reels: Sequence[Dict[str, int]]):
+        self.symbols: List[List[str]] = [list(reel) for reel in reels]
+        self.cum_weights: List[List[int]] = [
+            list(accumulate(reel.values())) for reel in reels
+        ]
+        self.payouts: List[int] = []
+        self.probabilities: List[float] = []
+        self._index: Dict[Outcome, int] = {}
+        for outcome in product(*(enumerate(symbols) for symbols in self.symbols)):
+            chance = 1.0
+            for reel, (position, _) in enumerate(outcome):
+                weight = self.cum_weights[reel][position]
+                if position:
+                    weight -= self.cum_weights[reel][position - 1]
+                chance *= weight / self.cum_weights[reel][-1]
+            symbols = tuple(symbol for _, symbol in outcome)
+            self._index.setdefault(symbols, len(self.payouts))
+            self.payouts.append(line_pay(symbols))
+            self.probabilities.append(chance)
+
+    def spin(self, rng: random.Random = random) -> Outcome:
+        """The symbols of one spin, one per reel."""
+        return tuple(
+            rng.choices(symbols, cum_weights=cum_weights)[0]
+            for symbols, cum_weights in zip(self.symbols, self.cum_weights)
+        )
+
+    def spins(self, k: int, rng: random.Random = random) -> List[Outcome]:
+        """The symbols of `k` spins drawn at once, a batch of draws per reel."""
+        reels = [
+            rng.choices(symbols, cum_weights=cum_weights, k=k)
+            for symbols, cum_weights in zip(self.symbols, self.cum_weights)
+        ]
+        return list(zip(*reels))
+
+    def payout(self, outcome: Outcome) -> int:
+        """What `outcome` pays per coin bet."""
+        return self.payouts[self._index[outcome]]
+
+    def rtp(self) -> Tuple[float, float]:
+        """The exact return to player and its variance, per coin bet on one spin."""
+        mean = sum(p * pay for p, pay in zip(self.probabilities, self.payouts))
+        variance = sum(
+            p * (pay - mean) ** 2 for p, pay in zip(self.probabilities, self.payouts)
+        )
+        return mean, variance
+
+    def hit_rate(self) -> float:
+        """The chance a spin pays anything."""
+        return sum(p for p, pay in zip(self.probabilities, self.payouts) if pay)
+
+
+machine = SlotMachine(REELS)
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Optional, Set
+
+from tools.finnhub import Finnhub
+
+log = logging.getLogger(__name__)
+
+# US exchanges stocks can be traded from, by market identifier code.
+# https://en.wikipedia.org/wiki/Market_Identifier_Code
+STOCK_EXCHANGES = {
+    "XNYS": "NYSE",
+    "XNAS": "All NASDAQ Exchanges",
+    "XASE": "AMEX",
+    "ARCX": "NYSE Arca",
+}
+
+# Crypto exchanges coins can be traded from.
+CRYPTO_EXCHANGES = [
+    "kraken",
+    "zb",
+    "bitmex",
+    "kucoin",
+    "poloniex",
+    "hitbtc",
+    "okex",
+    "bitfinex",
+    "gemini",
+    "bittrex",
+    "binance",
+    "coinbase",
+    "huobi",
+    "fxpig",
+]
+
+# Bumped when the saved index changes shape, older files are downloaded again.
+INDEX_VERSION = 2
+
+
+class SymbolIndex:
+    """Every tradeable symbol, one set per asset class, so checking a symbol is a hash lookup.
+
+    The index is saved to `path` after every refresh and loaded from it at startup,
+    so a restart doesn't download tens of thousands of symbols again.
+    Crypto symbols keep their exchange, "BINANCE:BTCUSDT", as that's what quotes take.
+
+    Example:
+        >index = SymbolIndex("data/symbols.json")
+        >index.load()
+        >if index.is_stale(24 * 60 * 60):
+        >    await index.refresh(finnhub)
+        >"AAPL" in index
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stocks: Set[str] = set()
+        self.crypto: Set[str] = set()
+        self.built_at: Optional[float] = None
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.stocks or symbol in self.crypto
+
+    def __len__(self) -> int:
+        return len(self.stocks) + len(self.crypto)
+
+    def is_stale(self, max_age: float) -> bool:
+        """Whether the index is missing or older than `max_age` seconds."""
+        return self.built_at is None or time.time() - self.built_at > max_age
+
+    def load(self) -> bool:
+        """Load the index saved by the last refresh, returns whether there was one."""
+        try:
+            with open(self.path, encoding="UTF-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            log.warning(f"Unable to load symbol index from {self.path}: {e}")
+            return False
+        if data.get("version") != INDEX_VERSION:
+            log.info(f"Symbol index in {self.path} is out of date, rebuilding it.")
+            return False
+
+        self.stocks = set(data["stocks"])
+        self.crypto = set(data["crypto"])
+        self.built_at = data["built_at"]
+        log.info(f"Loaded {len(self):,} symbols from {self.path}.")
+        return True
+
+    def save(self) -> None:
+        """Write the index to `path`, replacing the old file only once the new one is complete."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="UTF-8") as file:
+            json.dump(
+                dict(
+                    version=INDEX_VERSION,
+                    built_at=self.built_at,
+                    stocks=sorted(self.stocks),
+                    crypto=sorted(self.crypto),
+                ),
+                file,
+            )
+        os.replace(temporary, self.path)
+
+    async def refresh(self, finnhub: Finnhub) -> None:
+        """Download every exchange's symbols and swap them in, then save the index.
+
+        If any exchange fails the old index is kept, a partial one would
+        refuse trades that are allowed.
+        """
+        stock_lists, crypto_lists = await asyncio.gather(
+            asyncio.gather(*(finnhub.stock_symbols(mic) for mic in STOCK_EXCHANGES)),
+            asyncio.gather(
+                *(finnhub.crypto_symbols(exchange) for exchange in CRYPTO_EXCHANGES)
+            ),
+        )
+
+        self.stocks = {x["symbol"] for symbols in stock_lists for x in symbols}
+        self.crypto = {x["symbol"] for symbols in crypto_lists for x in symbols}
+        self.built_at = time.time()
+        log.info(
+            f"Symbol index refreshed: {len(self.stocks):,} stocks, {len(self.crypto):,} crypto."
+        )
+
+        await asyncio.get_running_loop().run_in_executor(None, self.save)